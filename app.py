@@ -1,79 +1,33 @@
 #Phase 4 with gemini 
 #3
 import streamlit as st
-import requests
-import pandas as pd
+import hmac
 import os
 import math
-from google import genai
 
-# -------------------------------------------------
-# DOI NORMALIZATION
-# -------------------------------------------------
-def normalize_doi(query):
-    query = query.strip()
-    if "doi.org/" in query:
-        return query.split("doi.org/")[-1]
-    return query
-
-# -------------------------------------------------
-# Semantic Scholar URL NORMALIZATION ✅
-# -------------------------------------------------
-def normalize_semantic_scholar_url(query):
-    query = query.strip()
-    if "semanticscholar.org/paper/" in query:
-        return query.rstrip("/").split("/")[-1]
-    return None
-
-# -------------------------------------------------
-# arXiv URL NORMALIZATION
-# -------------------------------------------------
-def normalize_arxiv_url(query):
-    query = query.strip()
-    if "arxiv.org/" in query:
-        # examples:
-        # https://arxiv.org/abs/2301.12345
-        # https://arxiv.org/pdf/2301.12345.pdf
-        parts = query.rstrip("/").split("/")
-        arxiv_id = parts[-1].replace(".pdf", "")
-        return arxiv_id
-    return None
-
-
-# -------------------------------------------------
-# IEEE / SPRINGER URL NORMALIZATION
-# -------------------------------------------------
-def normalize_publisher_url(query):
-    query = query.strip()
-
-    if "ieeexplore.ieee.org/document/" in query:
-        # https://ieeexplore.ieee.org/document/1234567
-        return query.rstrip("/").split("/")[-1]
-
-    if "link.springer.com/article/" in query:
-        # https://link.springer.com/article/10.1007/s12345-678-9012
-        return query.rstrip("/").split("/")[-1]
-
-    return None
-
-
-
-# -------------------------------------------------
-# Google-Scholar-like Helpers
-# -------------------------------------------------
-def title_similarity(a, b):
-    a = a.lower()
-    b = b.lower()
-    a_words = set(a.split())
-    b_words = set(b.split())
-    return len(a_words & b_words) / max(len(a_words), 1)
-
-def is_exact_title_query(query):
-    return len(query.split()) >= 6
+from collections import OrderedDict
+
+from scholar import (
+    SORT_OPTIONS, sorted_page, sorted_page_async, search_page_async,
+    search_local, search_papers, merge_results, is_exact_title_query
+)
+from authors import author_page, author_page_async, get_authors, search_authors
+from batch import resolve_identifiers
+from citation_graph import expand_graph
+from bulk import BulkCheckpoint, BulkSearchError, iter_bulk_search
+from export import EXPORT_FORMATS, JsonlWriter, convert_jsonl
+from providers import PROVIDERS, fan_out
+from gemini import paper_key, stream_summary, summarize_papers
+from models import Paper, parse_papers
+import metrics
 
 # -------------------------------------------------
 # App Config
 # -------------------------------------------------
+# Each phase of this run is timed into metrics.py (see the admin panel)
+rerun = metrics.RerunTimer()
+metrics.start_server()
+
 st.set_page_config(page_title="AI Research Explorer", layout="wide")
 st.title("🔍 AI Research Explorer")
 st.caption("Semantic Scholar + Gemini AI + Datasets & Code")
@@ -81,152 +35,55 @@ st.caption("Semantic Scholar + Gemini AI + Datasets & Code")
 # -------------------------------------------------
 # Gemini API Setup
 # -------------------------------------------------
-GEMINI_API_KEY = st.secrets.get("GEMINI_API_KEY", os.getenv("GEMINI_API_KEY"))
-client = genai.Client(api_key=GEMINI_API_KEY) if GEMINI_API_KEY else None
+@st.cache_resource(show_spinner=False)
+def gemini_client():
+    # Built on the first summary request and shared by every session;
+    # google.genai alone takes over half a second to import
+    try:
+        api_key = st.secrets.get("GEMINI_API_KEY", os.getenv("GEMINI_API_KEY"))
+    except FileNotFoundError:
+        # No secrets.toml: fall back to the environment
+        api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return None
+    from google import genai
+    return genai.Client(api_key=api_key)
 
 # -------------------------------------------------
 # Constants
 # -------------------------------------------------
 PAPERS_PER_PAGE = 10
-MAX_PAPERS = 25
+MAX_CACHED_PAGES = 10
+# How often a page served from stale cache checks for its refreshed version
+REFRESH_POLL_SECONDS = 2
+SEARCH_MODES = ["Papers", "Authors"]
 
 # -------------------------------------------------
 # Session State
 # -------------------------------------------------
 for k, v in {
-    "papers": [],
+    "search": None,
+    "author": None,
+    "author_candidates": [],
+    "result_pages": OrderedDict(),
+    "result_set": 0,
+    "result_totals": {},
+    "search_failed": False,
+    "page_views": OrderedDict(),
+    "prefetch": {},
+    "refreshing": {},
     "page": 1,
     "total_pages": 1,
     "best_paper": None,
-    "similar_papers": [],
-    "show_all": False
+    "show_all": False,
+    "reading_list": [],
+    "citation_graph": None,
+    "page_summaries": {},
+    "pending_search": None
 }.items():
     if k not in st.session_state:
         st.session_state[k] = v
 
-# -------------------------------------------------
-# Semantic Scholar Search
-# -------------------------------------------------
-def search_papers(query, from_year=None, to_year=None, limit=25):
-    query = normalize_doi(query)
-
-    # -------------------------------------------------
-    # URL NORMALIZATION (Semantic Scholar / arXiv / IEEE / Springer)
-    # -------------------------------------------------
-    ss_id = normalize_semantic_scholar_url(query)
-    arxiv_id = normalize_arxiv_url(query)
-    publisher_id = normalize_publisher_url(query)
-
-
-    # 1️⃣ DOI SEARCH
-    if query.startswith("10."):
-        url = f"https://api.semanticscholar.org/graph/v1/paper/DOI:{query}"
-        params = {
-            "fields": "title,authors,year,abstract,url,citationCount,venue"
-        }
-        try:
-            r = requests.get(url, params=params, timeout=10)
-            if r.status_code == 200:
-                return [r.json()]
-            return []
-        except:
-            return []
-
-    # 1️ Semantic Scholar URL SEARCH (Paper ID)
-    paper_id = normalize_semantic_scholar_url(query)
-    if paper_id:
-        url = f"https://api.semanticscholar.org/graph/v1/paper/{paper_id}"
-        params = {
-            "fields": "title,authors,year,abstract,url,citationCount,venue"
-        }
-        try:
-            r = requests.get(url, params=params, timeout=10)
-            if r.status_code == 200:
-                return [r.json()]  # ✅ exact paper
-            return []
-        except:
-            return []
-
-    # 2️ arXiv URL SEARCH
-    if arxiv_id:
-        url = f"https://api.semanticscholar.org/graph/v1/paper/ARXIV:{arxiv_id}"
-        params = {
-            "fields": "title,authors,year,abstract,url,citationCount,venue"
-        }
-        try:
-            r = requests.get(url, params=params, timeout=10)
-            if r.status_code == 200:
-                return [r.json()]
-            return []
-        except:
-            return []
-
-    # 3️ IEEE / Springer URL SEARCH (fallback to keyword)
-    if publisher_id:
-        query = publisher_id.replace("-", " ").replace(".", " ")
-
-
-    # 4 NORMAL SEARCH
-    url = "https://api.semanticscholar.org/graph/v1/paper/search"
-    params = {
-        "query": query,
-        "limit": limit,
-        "fields": "title,authors,year,abstract,url,citationCount,venue"
-    }
-
-    try:
-        r = requests.get(url, params=params, timeout=10)
-        if r.status_code != 200:
-            return []
-
-        data = r.json().get("data", [])
-
-        # Year filter
-        if from_year and to_year:
-            data = [
-                p for p in data
-                if isinstance(p.get("year"), int)
-                and from_year <= p["year"] <= to_year
-            ]
-
-        # Google-Scholar-like ranking
-        if is_exact_title_query(query):
-            for p in data:
-                p["_score"] = title_similarity(query, p.get("title", ""))
-            data = sorted(data, key=lambda x: x.get("_score", 0), reverse=True)
-
-        return data
-    except:
-        return []
-
-# -------------------------------------------------
-# Gemini Summary
-# -------------------------------------------------
-def gemini_summary(paper):
-    if not client or not paper.get("abstract"):
-        return "⚠️ Gemini unavailable or abstract missing."
-
-    prompt = f"""
-Summarize the paper academically.
-
-Title: {paper['title']}
-Abstract: {paper['abstract']}
-
-Provide:
-- Methods
-- Pros
-- Cons
-- Open research problems
-"""
-    try:
-        res = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
-        return res.text
-    except Exception as e:
-        return f"⚠️ Gemini error: {e}"
-
 # -------------------------------------------------
 # Dataset / Code Links
 # -------------------------------------------------
@@ -244,6 +101,7 @@ def dataset_links(title):
 # -------------------------------------------------
 with st.form("search_form"):
     query = st.text_input("Search by topic / author / title / DOI")
+    search_mode = st.radio("Search for", SEARCH_MODES, horizontal=True)
 
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -253,80 +111,514 @@ with st.form("search_form"):
     with col3:
         to_year = st.number_input("To year", 1900, 2100, 2025) if enable_year else None
 
-    sort_by = st.selectbox("Sort by", ["Newest", "Citations"])
     submitted = st.form_submit_button("🔍 Search")
 
+# Outside the form so a new ordering applies without searching again
+sort_by = st.selectbox("Sort by", SORT_OPTIONS)
+
 # -------------------------------------------------
-# Search Logic
+# Reading List (batch DOI / arXiv / S2 lookup)
+# -------------------------------------------------
+# A fragment: resolving a list reruns only this panel, not the whole app
+@st.fragment
+def reading_list_panel():
+    with st.expander("📋 Resolve a reading list"):
+        with st.form("reading_list_form"):
+            ids_text = st.text_area("One DOI / arXiv URL / Semantic Scholar URL or ID per line")
+            resolve = st.form_submit_button("Resolve")
+
+        if resolve and ids_text.strip():
+            entries = [line.strip() for line in ids_text.splitlines() if line.strip()]
+            with st.spinner(f"Resolving {len(entries)} identifiers..."):
+                st.session_state.reading_list = resolve_identifiers(entries)
+
+        for item in st.session_state.reading_list:
+            if item["paper"]:
+                p = item["paper"]
+                st.markdown(f"- [{p.title}]({p.url}) ({p.year})")
+            else:
+                st.markdown(f"- ⚠️ `{item['input']}` — {item['error']}")
+
+reading_list_panel()
+
+# -------------------------------------------------
+# Bulk Survey (streams thousands of matches, resumable)
+# -------------------------------------------------
+BULK_PREVIEW = 10
+
+def read_export(jsonl_path, fmt):
+    """The survey export in ``fmt``, converted from the JSONL checkpoint
+    export only if that has changed since the last conversion."""
+    if fmt == "JSONL":
+        path = jsonl_path
+    else:
+        ext, _ = EXPORT_FORMATS[fmt]
+        path = os.path.splitext(jsonl_path)[0] + f".{ext}"
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(jsonl_path):
+            convert_jsonl(jsonl_path, path, fmt)
+    with open(path, "rb") as f:
+        return f.read()
+
+# Also a fragment, so a long survey run leaves the search results alone
+@st.fragment
+def bulk_survey_panel():
+    with st.expander("📚 Bulk survey"):
+        with st.form("bulk_form"):
+            bulk_query = st.text_input("Survey query")
+            bulk_max = st.number_input("Max papers", 100, 1_000_000, 5000, step=1000)
+            bulk_format = st.selectbox("Export format", list(EXPORT_FORMATS))
+            b1, b2 = st.columns(2)
+            with b1:
+                bulk_start = st.form_submit_button("▶ Start / resume")
+            with b2:
+                bulk_reset = st.form_submit_button("↺ Start over")
+
+        if bulk_query and (bulk_start or bulk_reset):
+            checkpoint = BulkCheckpoint.for_search(bulk_query)
+            if bulk_reset:
+                checkpoint.clear()
+            if checkpoint.started and not checkpoint.done:
+                st.caption(f"Resuming after {checkpoint.count} papers")
+
+            progress = st.empty()
+            preview = []
+            streamed = checkpoint.count
+            # Every streamed paper goes straight to disk; nothing accumulates here
+            sink = JsonlWriter(checkpoint.export_path, append=checkpoint.started)
+            try:
+                for paper in iter_bulk_search(
+                    bulk_query, max_papers=bulk_max, checkpoint=checkpoint
+                ):
+                    sink.write(paper)
+                    streamed += 1
+                    if len(preview) < BULK_PREVIEW:
+                        preview.append(Paper.from_api(paper))
+                    if streamed % 250 == 0:
+                        progress.caption(f"Streamed {streamed} papers...")
+            except BulkSearchError as e:
+                st.warning(f"⚠️ {e}. Press Start / resume to continue.")
+            finally:
+                sink.close()
+
+            progress.caption(
+                f"✅ {checkpoint.count} papers streamed"
+                + (" (complete)" if checkpoint.done else "")
+            )
+            for p in preview:
+                st.markdown(f"- [{p.title}]({p.url}) ({p.year})")
+
+            if checkpoint.count:
+                ext, mime = EXPORT_FORMATS[bulk_format]
+                # Deferred: the file is only converted and read on click
+                st.download_button(
+                    f"⬇️ Export to {bulk_format}",
+                    data=lambda: read_export(checkpoint.export_path, bulk_format),
+                    file_name=f"research_papers.{ext}",
+                    mime=mime,
+                    on_click="ignore"
+                )
+
+bulk_survey_panel()
+
+# -------------------------------------------------
+# Citation Graph (references / citations around a seed paper)
 # -------------------------------------------------
-if submitted and query:
-    results = search_papers(query, from_year, to_year, MAX_PAPERS)
+GRAPH_DIRECTIONS = {"Both": "both", "References": "references", "Citations": "citations"}
+
+@st.fragment
+def citation_graph_panel():
+    with st.expander("🕸 Citation graph"):
+        with st.form("graph_form"):
+            seed_query = st.text_input("Seed paper (title / DOI / arXiv or Semantic Scholar URL)")
+            g1, g2 = st.columns(2)
+            with g1:
+                graph_depth = st.slider("Depth", 1, 3, 1)
+            with g2:
+                graph_direction = st.selectbox("Follow", list(GRAPH_DIRECTIONS))
+            explore = st.form_submit_button("Explore")
+
+        if explore and seed_query.strip():
+            seeds = search_papers(seed_query, limit=1)
+            if not seeds:
+                st.warning("⚠️ Seed paper not found.")
+                st.session_state.citation_graph = None
+            else:
+                with st.spinner("Walking the citation graph..."):
+                    st.session_state.citation_graph = expand_graph(
+                        seeds[0], graph_depth, GRAPH_DIRECTIONS[graph_direction]
+                    )
+
+        graph = st.session_state.citation_graph
+        if graph:
+            st.markdown(f"**Seed:** {graph.titles[0]}")
+            st.caption(
+                f"{len(graph)} papers · {graph.edge_count} links"
+                + (" · size or time limit reached" if graph.truncated else "")
+                + (f" · {len(graph.failed)} papers could not be expanded" if graph.failed else "")
+            )
+            st.dataframe(graph.top_nodes(), hide_index=True)
+
+citation_graph_panel()
+
+rerun.mark("forms")
 
-    if is_exact_title_query(query) and len(results) > 1:
-        st.session_state.best_paper = results[0]
-        st.session_state.similar_papers = results[1:]
-        st.session_state.papers = [results[0]]
+# -------------------------------------------------
+# Search Logic
+# -------------------------------------------------
+def set_total_pages(total, sort_by):
+    # Remembered per ordering: bulk-sorted totals differ from relevance ones
+    st.session_state.result_totals[sort_by] = total
+    st.session_state.total_pages = max(1, math.ceil(total / PAPERS_PER_PAGE))
+
+def show_results(query, first_page, total, refresh=None, failed=False):
+    # Parsed once here; session state only ever holds Paper records
+    first_page = parse_papers(first_page)
+    sort_by = st.session_state.search["sort_by"]
+    # A failed first page isn't kept, so Retry fetches it again
+    st.session_state.result_pages = (
+        OrderedDict() if failed else OrderedDict([((sort_by, 1), first_page)])
+    )
+    st.session_state.search_failed = bool(failed)
+    st.session_state.result_set += 1
+    st.session_state.page_views = OrderedDict()
+    st.session_state.prefetch = {}
+    st.session_state.refreshing = {(sort_by, 1): refresh} if refresh else {}
+    st.session_state.page = 1
+    st.session_state.result_totals = {}
+    set_total_pages(total, sort_by)
+
+    # Only the relevance ordering puts the closest title match first
+    title_match = (
+        sort_by == "Relevance"
+        and st.session_state.search.get("author_id") is None
+        and is_exact_title_query(query)
+    )
+    if title_match and len(first_page) > 1:
+        st.session_state.best_paper = first_page[0]
         st.session_state.show_all = False
     else:
-        st.session_state.papers = results
-        st.session_state.similar_papers = []
+        st.session_state.best_paper = None
         st.session_state.show_all = True
 
-    st.session_state.page = 1
-    st.session_state.total_pages = max(
-        1, math.ceil(len(st.session_state.papers) / PAPERS_PER_PAGE)
+def fetch_page(page):
+    search = st.session_state.search
+    if search.get("author_id"):
+        return author_page(
+            search["author_id"], search["from_year"], search["to_year"], search["sort_by"],
+            PAPERS_PER_PAGE, (page - 1) * PAPERS_PER_PAGE
+        )
+    return sorted_page(
+        search["query"], search["from_year"], search["to_year"], search["sort_by"],
+        PAPERS_PER_PAGE, (page - 1) * PAPERS_PER_PAGE
     )
 
-# -------------------------------------------------
-# Google Scholar Message
-# -------------------------------------------------
-if st.session_state.best_paper and not st.session_state.show_all:
-    st.success("✅ Showing the best result for this search.")
-    if st.button("🔍 See all results"):
-        st.session_state.papers = (
-            [st.session_state.best_paper] +
-            st.session_state.similar_papers
+def load_page(page):
+    # Pages are kept per ordering, so switching sort back and forth is free
+    key = (st.session_state.search["sort_by"], page)
+    pages = st.session_state.result_pages
+    if key in pages:
+        pages.move_to_end(key)
+        set_total_pages(st.session_state.result_totals[key[0]], key[0])
+        return pages[key]
+
+    future = st.session_state.prefetch.pop(key, None)
+    result = future.result() if future else fetch_page(page)
+    if not result["data"]:
+        # Failed or past the end; not kept so a later visit retries
+        st.session_state.search_failed = bool(result.get("failed"))
+        return []
+    pages[key] = parse_papers(result["data"])
+    set_total_pages(result["total"], key[0])
+    if result.get("refresh"):
+        st.session_state.refreshing[key] = result["refresh"]
+
+    # Keep only the most recently viewed pages in the session
+    while len(pages) > MAX_CACHED_PAGES:
+        pages.popitem(last=False)
+    return pages[key]
+
+def prefetch_page(page):
+    search = st.session_state.search
+    key = (search["sort_by"], page)
+    if (
+        page <= st.session_state.total_pages
+        and key not in st.session_state.result_pages
+        and key not in st.session_state.prefetch
+    ):
+        if search.get("author_id"):
+            st.session_state.prefetch[key] = author_page_async(
+                search["author_id"], search["from_year"], search["to_year"],
+                search["sort_by"], PAPERS_PER_PAGE, (page - 1) * PAPERS_PER_PAGE,
+                background=True
+            )
+            return
+        st.session_state.prefetch[key] = sorted_page_async(
+            search["query"], search["from_year"], search["to_year"], search["sort_by"],
+            PAPERS_PER_PAGE, (page - 1) * PAPERS_PER_PAGE, background=True
         )
-        st.session_state.show_all = True
-        st.session_state.total_pages = max(
-            1, math.ceil(len(st.session_state.papers) / PAPERS_PER_PAGE)
+
+def show_author(author_id):
+    # The profile is usually cached from the candidate search already
+    profile = get_authors([author_id])[0] or {"authorId": author_id}
+    st.session_state.author = profile
+    st.session_state.author_candidates = []
+    st.session_state.search = {
+        "query": profile.get("name") or "", "author_id": author_id,
+        "from_year": from_year, "to_year": to_year, "sort_by": sort_by
+    }
+    first = fetch_page(1)
+    show_results(
+        st.session_state.search["query"], first["data"], first["total"],
+        failed=first.get("failed")
+    )
+    st.session_state.pending_search = None
+
+# Author names on the paper cards link here as ?author=<id>
+author_link = st.query_params.get("author")
+if author_link:
+    del st.query_params["author"]
+    show_author(author_link)
+
+if submitted and query and search_mode == "Authors":
+    st.session_state.author_candidates = search_authors(query)
+    if not st.session_state.author_candidates:
+        st.warning("No authors found.")
+
+elif submitted and query:
+    st.session_state.author = None
+    st.session_state.author_candidates = []
+    st.session_state.search = {
+        "query": query, "from_year": from_year, "to_year": to_year, "sort_by": sort_by
+    }
+
+    # Answer from the local index first; the network result is merged in below
+    local = search_local(query, from_year, to_year, PAPERS_PER_PAGE) if sort_by == "Relevance" else []
+    if local:
+        show_results(query, local, len(local))
+        st.session_state.pending_search = {
+            "query": query,
+            "local": local,
+            "future": search_page_async(query, from_year, to_year, PAPERS_PER_PAGE),
+        }
+    else:
+        first = fetch_page(1)
+        show_results(
+            query, first["data"], first["total"], first.get("refresh"), first.get("failed")
         )
-        st.rerun()
+        st.session_state.pending_search = None
+
+elif st.session_state.search and st.session_state.search["sort_by"] != sort_by:
+    # New ordering of the same result set: start from its first page
+    st.session_state.search["sort_by"] = sort_by
+    st.session_state.page = 1
+    st.session_state.search_failed = False
 
 # -------------------------------------------------
-# Pagination & Display
+# Author Candidates
 # -------------------------------------------------
-papers = st.session_state.papers
+def author_summary(a):
+    return " · ".join(
+        (a.get("affiliations") or [])
+        + [f"{a.get('paperCount') or 0} papers", f"h-index {a.get('hIndex') or 0}"]
+    )
 
-if papers:
-    page = st.session_state.page
-    start = (page - 1) * PAPERS_PER_PAGE
-    end = start + PAPERS_PER_PAGE
-    page_papers = papers[start:end]
+for a in st.session_state.author_candidates:
+    c1, c2 = st.columns([4, 1])
+    with c1:
+        st.markdown(f"**{a.get('name')}**")
+        st.caption(author_summary(a))
+    with c2:
+        if st.button("📚 Papers", key=f"author_{a['authorId']}"):
+            show_author(a["authorId"])
+            st.rerun()
 
-    st.subheader(f"📄 Papers (Page {page}/{st.session_state.total_pages})")
+# -------------------------------------------------
+# Render Model (per-page view data, reused across reruns)
+# -------------------------------------------------
+def author_links(p):
+    # Each name opens that author's papers; names without an id stay plain
+    return ", ".join(
+        f"[{name}](?author={author_id})" if author_id else name
+        for author_id, name in p.author_refs
+    )
 
-    for i, p in enumerate(page_papers, start=1):
-        st.markdown("---")
-        st.subheader(f"{start + i}. {p.get('title')}")
+def card_view(p, number):
+    return {
+        "paper": p,
+        "key": paper_key(p),
+        "heading": f"{number}. {p.title}",
+        "authors": f"**Authors:** {author_links(p)}",
+        "meta": f"**Year:** {p.year} | **Citations:** {p.citations}",
+        "preview": p.abstract_preview,
+        "link": f"[🔗 View Paper]({p.url})" if p.url else None,
+        "datasets": "\n".join(
+            f"- [{name}]({link})" for name, link in dataset_links(p.title).items()
+        ),
+    }
 
-        authors = ", ".join(a["name"] for a in p.get("authors", []))
-        st.write(f"**Authors:** {authors}")
-        st.write(f"**Year:** {p.get('year')} | **Citations:** {p.get('citationCount', 0)}")
+def page_view(view_key, papers, start):
+    """Card text and dataset/code lookups for one page, built once per
+    result set and page so a rerun only redraws the widgets."""
+    views = st.session_state.page_views
+    view = views.get(view_key)
+    if view is None:
+        view = views[view_key] = {
+            "cards": [card_view(p, start + i) for i, p in enumerate(papers, start=1)],
+            # Started up front so every paper's lookups run in parallel
+            "lookups": [fan_out(p.title) for p in papers],
+        }
+        while len(views) > MAX_CACHED_PAGES:
+            views.popitem(last=False)
+    else:
+        views.move_to_end(view_key)
+        # Finished lookups replay their results; only the providers that
+        # failed are asked again, once their backoff has passed
+        for lookup in view["lookups"]:
+            if lookup.failed:
+                lookup.retry()
+    return view
+
+# Each card is a fragment: its summary button and lookups rerun only
+# that card, not the whole page
+@st.fragment
+def paper_card(i, card, lookup):
+    st.markdown("---")
+    st.subheader(card["heading"])
+
+    st.markdown(card["authors"])
+    st.markdown(card["meta"])
+
+    if card["preview"]:
+        st.markdown(card["preview"])
+
+    if card["link"]:
+        st.markdown(card["link"])
+
+    page_summary = st.session_state.page_summaries.get(card["key"])
+    if page_summary:
+        with st.container(border=True):
+            st.markdown(page_summary)
+    elif st.button("🧠 Gemini Summary", key=f"g{i}"):
+        summary = stream_summary(gemini_client(), card["paper"])
+        with st.container(border=True):
+            st.write_stream(summary)
+        # Kept so later reruns and page switches show it without regenerating
+        # (``total`` stays unset when Gemini wasn't available at all)
+        if summary.error is None and summary.total is not None:
+            st.session_state.page_summaries[card["key"]] = summary.text
+        if summary.cached:
+            st.caption("⚡ Cached summary")
+        elif summary.first_token is not None:
+            st.caption(
+                f"⏱ First token {summary.first_token:.2f}s · total {summary.total:.2f}s"
+            )
+
+    with st.expander("📦 Datasets & Code"):
+        st.markdown(card["datasets"])
+
+        slots = {provider.name: st.empty() for provider in PROVIDERS}
+        for result in lookup:
+            slot = slots[result.provider.name]
+            label = f"**{result.provider.name}**"
+            if result.status == "ok" and result.items:
+                slot.markdown(label + "\n" + "\n".join(
+                    f"- {result.provider.icon} [{item['title']}]({item['url']})"
+                    for item in result.items
+                ))
+            elif result.status == "ok":
+                slot.caption(f"{result.provider.name}: nothing found")
+            elif result.status == "timeout":
+                slot.caption(f"{result.provider.name}: timed out")
+            elif result.status == "backoff":
+                slot.caption(f"{result.provider.name}: unavailable, retrying shortly")
+            elif result.status == "unconfigured":
+                slot.caption(f"{result.provider.name}: not configured (API token required)")
+            else:
+                slot.caption(f"{result.provider.name}: unavailable")
 
-        if p.get("abstract"):
-            st.write(p["abstract"][:400] + "...")
 
-        if p.get("url"):
-            st.markdown(f"[🔗 View Paper]({p['url']})")
+# -------------------------------------------------
+# Stale-while-revalidate
+# -------------------------------------------------
+@st.fragment(run_every=REFRESH_POLL_SECONDS)
+def watch_refreshes():
+    # Pages served from stale cache are dropped once their refresh lands
+    # with different results; the rerun then reloads them from cache.
+    changed = False
+    for key, future in list(st.session_state.refreshing.items()):
+        if not future.done():
+            continue
+        del st.session_state.refreshing[key]
+        if future.exception() is None and future.result():
+            st.session_state.result_pages.pop(key, None)
+            st.session_state.page_views.pop((st.session_state.result_set,) + key, None)
+            changed = True
+    if changed:
+        st.rerun()
+
+# -------------------------------------------------
+# Google Scholar Message
+# -------------------------------------------------
+if st.session_state.best_paper and not st.session_state.show_all:
+    st.success("✅ Showing the best result for this search.")
+    if st.button("🔍 See all results"):
+        st.session_state.show_all = True
+        st.rerun()
 
-        if st.button("🧠 Gemini Summary", key=f"g{i}"):
-            with st.spinner("Analyzing paper..."):
-                st.info(gemini_summary(p))
+rerun.mark("search")
 
-        with st.expander("📦 Datasets & Code"):
-            for name, link in dataset_links(p["title"]).items():
-                st.markdown(f"- [{name}]({link})")
+# -------------------------------------------------
+# Pagination & Display
+# -------------------------------------------------
+page = st.session_state.page
+start = (page - 1) * PAPERS_PER_PAGE
+page_papers = []
+# After a failed fetch nothing is retried until the user asks for it
+if st.session_state.search and not st.session_state.search_failed:
+    if st.session_state.show_all:
+        page_papers = load_page(page)
+        # Fetch the next page while this one is being read
+        if page_papers:
+            prefetch_page(page + 1)
+        if st.session_state.refreshing:
+            watch_refreshes()
+    else:
+        page_papers = [st.session_state.best_paper]
+rerun.mark("load_page")
+
+if page_papers:
+    total_pages = st.session_state.total_pages if st.session_state.show_all else 1
+    author = st.session_state.author
+    if st.session_state.search.get("author_id") and author:
+        st.subheader(f"👤 {author.get('name') or 'Author'}")
+        st.caption(author_summary(author))
+    st.subheader(f"📄 Papers (Page {page}/{total_pages})")
+
+    view_key = (
+        st.session_state.result_set,
+        st.session_state.search["sort_by"] if st.session_state.show_all else "best",
+        page,
+    )
+    view = page_view(view_key, page_papers, start)
+
+    if st.button("🧠 Summarize this page"):
+        with st.spinner(f"Summarizing {len(page_papers)} papers..."):
+            summaries = summarize_papers(gemini_client(), page_papers)
+        # Only real summaries are kept; the rest keep their own summary button
+        for p, summary in zip(page_papers, summaries):
+            if summary is not None:
+                st.session_state.page_summaries[paper_key(p)] = summary
+        missed = summaries.count(None)
+        if missed:
+            st.warning(
+                f"⚠️ {missed} of {len(page_papers)} papers could not be summarized "
+                "(Gemini unavailable, abstract missing or a model error)."
+            )
+
+    for i, (card, lookup) in enumerate(zip(view["cards"], view["lookups"]), start=1):
+        paper_card(i, card, lookup)
+
+    rerun.mark("render")
 
     c1, _, c3 = st.columns([1, 2, 1])
     with c1:
@@ -334,12 +626,77 @@ if papers:
             st.session_state.page -= 1
             st.rerun()
     with c3:
-        if st.button("Next ➡") and page < st.session_state.total_pages:
+        if st.button("Next ➡") and page < total_pages:
             st.session_state.page += 1
             st.rerun()
+elif st.session_state.search and (st.session_state.search_failed or page > 1):
+    # Semantic Scholar failed or rate limited us; earlier pages are still
+    # in the session
+    if st.session_state.search_failed:
+        st.error("⚠️ Semantic Scholar is busy right now, so these results could not be loaded.")
+    else:
+        st.error(f"⚠️ Page {page} could not be loaded.")
+    c1, _, c3 = st.columns([1, 2, 1])
+    with c1:
+        if page > 1 and st.button("⬅ Prev"):
+            st.session_state.search_failed = False
+            st.session_state.page -= 1
+            st.rerun()
+    with c3:
+        if st.button("↻ Retry"):
+            st.session_state.search_failed = False
+            st.rerun()
+elif st.session_state.search:
+    st.info("🔎 No papers found for this search.")
 else:
     st.info("🔎 Search to see papers")
 
+# -------------------------------------------------
+# Merge Network Results into Local-first Results
+# -------------------------------------------------
+pending = st.session_state.pending_search
+if pending:
+    with st.spinner("Updating results from Semantic Scholar..."):
+        network = pending["future"].result()
+    st.session_state.pending_search = None
+
+    if not network["data"]:
+        st.caption("📴 Showing results from the local index.")
+    else:
+        merged = merge_results(network["data"], pending["local"], PAPERS_PER_PAGE)
+        show_results(pending["query"], merged, network["total"])
+        st.rerun()
+
+rerun.finish()
+
+# -------------------------------------------------
+# Admin Panel (open the app with ?admin=<ADMIN_TOKEN>)
+# -------------------------------------------------
+def admin_token():
+    try:
+        return st.secrets.get("ADMIN_TOKEN", os.getenv("ADMIN_TOKEN"))
+    except FileNotFoundError:
+        return os.getenv("ADMIN_TOKEN")
+
+# The metrics are process-wide, so the panel stays off without a token
+token = admin_token()
+if token and hmac.compare_digest(st.query_params.get("admin", ""), token):
+    with st.sidebar:
+        st.header("📈 Metrics")
+        st.caption("Upstream calls since the server started")
+        st.dataframe(metrics.upstream_summary(), hide_index=True)
+        st.caption("Rerun phases")
+        st.dataframe(metrics.phase_summary(), hide_index=True)
+        st.download_button(
+            "⬇️ Prometheus text",
+            data=metrics.METRICS.render(),
+            file_name="metrics.prom",
+            mime="text/plain"
+        )
+        if st.button("Reset metrics"):
+            metrics.METRICS.reset()
+            st.rerun()
+
 #2
 # import streamlit as st
 # import requests
@@ -555,7 +912,7 @@ else:
 
 #         # Dataset & Code popup
 #         with st.expander("📦 Datasets & Code"):
-#             for name, link in dataset_links(p["title"]).items():
+#             for name, link in dataset_links(p.title).items():
 #                 st.markdown(f"- [{name}]({link})")
 
 #     # Pagination controls
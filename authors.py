@@ -0,0 +1,217 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_client
+import local_index
+import metrics
+import rate_limit
+import scholar
+from cache import DiskCache
+from scholar import PAPER_FIELDS, filter_years, normalize_query, sort_papers
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Author Settings
+# -------------------------------------------------
+AUTHOR_FIELDS = "name,affiliations,paperCount,citationCount,hIndex,url"
+AUTHOR_CANDIDATES = 10
+
+# /author/{id}/papers and /author/batch both take up to 1,000 at once, so
+# even a prolific author's bibliography is a handful of requests
+AUTHOR_PAPERS_PAGE = 1000
+AUTHOR_BATCH_SIZE = 1000
+AUTHOR_MAX_PAPERS = 10000
+
+# -------------------------------------------------
+# Author Cache
+# -------------------------------------------------
+AUTHOR_SEARCH_TTL = 60 * 60
+AUTHOR_PROFILE_TTL = 24 * 60 * 60
+AUTHOR_PAPERS_TTL = 6 * 60 * 60
+
+author_cache = DiskCache("authors", max_entries=5000, default_ttl=AUTHOR_PROFILE_TTL)
+
+# Next-page prefetches for author results
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="author")
+
+# Recently viewed bibliographies, decoded, with their filtered/sorted
+# orderings, so paging and re-sorting don't reload the whole list from disk
+AUTHOR_MEMORY_ENTRIES = 8
+_bibliographies = OrderedDict()
+_bibliographies_lock = threading.Lock()
+
+def profile_key(author_id, fields=AUTHOR_FIELDS):
+    return json.dumps(["author", str(author_id), fields])
+
+def papers_key(author_id, fields=PAPER_FIELDS):
+    return json.dumps(["author-papers", str(author_id), fields])
+
+# -------------------------------------------------
+# Author Search
+# -------------------------------------------------
+def search_authors(query, limit=AUTHOR_CANDIDATES):
+    """Author candidates for a name, best match first; [] on failure."""
+    key = json.dumps(["author-search", normalize_query(query), limit, AUTHOR_FIELDS])
+    cached = author_cache.get(key)
+    metrics.record_cache("author", "miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+
+    try:
+        r = http_client.get(
+            f"{scholar.S2_API}/author/search",
+            params={"query": query, "fields": AUTHOR_FIELDS, "limit": limit},
+            limiter=rate_limit.S2_SEARCH,
+            upstream="author",
+        )
+        if r.status_code != 200:
+            logger.warning("Author search returned %s for %r", r.status_code, query)
+            return []
+        authors = r.json().get("data", [])
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("Author search failed for %r: %s", query, e)
+        return []
+
+    author_cache.set(key, authors, ttl=AUTHOR_SEARCH_TTL)
+    # Profiles come back whole, so a later lookup needs no request
+    for author in authors:
+        author_cache.set(profile_key(author["authorId"]), author)
+    return authors
+
+def get_authors(author_ids):
+    """Profiles for ``author_ids`` in order (None where unknown), cached
+    ones served locally and the rest fetched via /author/batch."""
+    profiles = {}
+    missing = []
+    for author_id in dict.fromkeys(map(str, author_ids)):
+        cached = author_cache.get(profile_key(author_id))
+        if cached is not None:
+            profiles[author_id] = cached
+        else:
+            missing.append(author_id)
+
+    for start in range(0, len(missing), AUTHOR_BATCH_SIZE):
+        chunk = missing[start:start + AUTHOR_BATCH_SIZE]
+        try:
+            r = http_client.post(
+                f"{scholar.S2_API}/author/batch",
+                params={"fields": AUTHOR_FIELDS},
+                json={"ids": chunk},
+                limiter=rate_limit.S2_PAPER,
+                upstream="author",
+            )
+            if r.status_code != 200:
+                logger.warning("author/batch returned %s", r.status_code)
+                continue
+            found = r.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("Author batch lookup failed: %s", e)
+            continue
+        # Answered positionally, with null for unknown ids
+        for author_id, author in zip(chunk, found):
+            if author:
+                author_cache.set(profile_key(author_id), author)
+                profiles[author_id] = author
+
+    return [profiles.get(str(author_id)) for author_id in author_ids]
+
+# -------------------------------------------------
+# Author Papers
+# -------------------------------------------------
+def author_papers(author_id, max_papers=AUTHOR_MAX_PAPERS):
+    """The author's papers (API order), paged 1,000 at a time."""
+    return _load_author_papers(author_id, max_papers)[0]
+
+def _load_author_papers(author_id, max_papers):
+    # Returns (papers, whole), ``whole`` being False for a partial list
+    key = papers_key(author_id)
+    cached = author_cache.get(key)
+    metrics.record_cache("author_papers", "miss" if cached is None else "hit")
+    if cached is not None and (cached["complete"] or len(cached["data"]) >= max_papers):
+        return cached["data"][:max_papers], True
+
+    papers, offset, complete = [], 0, False
+    try:
+        while len(papers) < max_papers:
+            r = http_client.get(
+                f"{scholar.S2_API}/author/{author_id}/papers",
+                params={
+                    "fields": PAPER_FIELDS,
+                    "offset": offset,
+                    "limit": min(AUTHOR_PAPERS_PAGE, max_papers - len(papers)),
+                },
+                limiter=rate_limit.S2_PAPER,
+                upstream="author_papers",
+            )
+            if r.status_code != 200:
+                logger.warning("Author papers returned %s for %s", r.status_code, author_id)
+                break
+            body = r.json()
+            data = body.get("data") or []
+            papers.extend(data)
+            if not data or body.get("next") is None:
+                complete = True
+                break
+            offset = body["next"]
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("Author papers failed for %s: %s", author_id, e)
+
+    # A partial list is still shown, just not cached
+    whole = complete or len(papers) >= max_papers
+    if whole:
+        author_cache.set(key, {"data": papers, "complete": complete}, ttl=AUTHOR_PAPERS_TTL)
+        try:
+            local_index.add_papers(papers)
+        except sqlite3.Error as e:
+            logger.warning("Could not index author papers: %s", e)
+    return papers, whole
+
+def _bibliography(author_id):
+    with _bibliographies_lock:
+        entry = _bibliographies.get(author_id)
+        if entry is not None and time.monotonic() - entry["loaded"] < AUTHOR_PAPERS_TTL:
+            _bibliographies.move_to_end(author_id)
+            return entry
+
+    papers, whole = _load_author_papers(author_id, AUTHOR_MAX_PAPERS)
+    entry = {"papers": papers, "orderings": {}, "loaded": time.monotonic(), "whole": whole}
+    if whole:
+        with _bibliographies_lock:
+            _bibliographies[author_id] = entry
+            while len(_bibliographies) > AUTHOR_MEMORY_ENTRIES:
+                _bibliographies.popitem(last=False)
+    return entry
+
+def author_page(author_id, from_year=None, to_year=None, sort_by="Relevance",
+                limit=25, offset=0):
+    """One page of an author's papers, shaped like ``search_page``."""
+    entry = _bibliography(str(author_id))
+    key = (from_year, to_year, sort_by)
+    papers = entry["orderings"].get(key)
+    if papers is None:
+        # Lists of references into ``entry["papers"]``, not copies
+        papers = entry["orderings"][key] = sort_papers(
+            filter_years(entry["papers"], from_year, to_year), sort_by
+        )
+    page = {"data": papers[offset:offset + limit], "total": len(papers)}
+    # Nothing to show because the bibliography fetch failed, not because it's empty
+    if not page["data"] and not entry["whole"]:
+        page["failed"] = True
+    return page
+
+def author_page_async(author_id, from_year=None, to_year=None, sort_by="Relevance",
+                      limit=25, offset=0, background=False):
+    if background:
+        return _executor.submit(
+            rate_limit.run_in_background, author_page, author_id, from_year, to_year,
+            sort_by, limit, offset
+        )
+    return _executor.submit(author_page, author_id, from_year, to_year, sort_by, limit, offset)
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import re
+
+import requests
+
+import http_client
+import metrics
+import rate_limit
+import scholar
+from models import Paper
+from scholar import (
+    LOOKUP_CACHE_TTL,
+    PAPER_FIELDS,
+    identifier_ref,
+    lookup_cache_key,
+    search_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Batch Settings
+# -------------------------------------------------
+# The Graph API accepts at most 500 ids per /paper/batch request
+BATCH_CHUNK_SIZE = 100
+BATCH_CONCURRENCY = 4
+
+S2_PAPER_ID = re.compile(r"^[0-9a-f]{40}$", re.IGNORECASE)
+PREFIXED_ID = re.compile(r"^(DOI|ARXIV|CORPUSID|PMID|PMCID|MAG|ACL|URL):\S+$", re.IGNORECASE)
+
+# -------------------------------------------------
+# Identifier Classification
+# -------------------------------------------------
+def classify_identifier(entry):
+    """Map a pasted DOI / arXiv / Semantic Scholar reference to a Graph API
+    paper id, or return None if it is not recognised."""
+    entry = entry.strip()
+    if not entry:
+        return None
+
+    if PREFIXED_ID.match(entry):
+        prefix, value = entry.split(":", 1)
+        return f"{prefix.upper()}:{value}"
+
+    # DOI / Semantic Scholar URL / arXiv URL, same rules as search_papers
+    paper_ref = identifier_ref(entry)
+    if paper_ref:
+        return paper_ref
+
+    if S2_PAPER_ID.match(entry):
+        return entry.lower()
+
+    return None
+
+# -------------------------------------------------
+# Chunk Resolution
+# -------------------------------------------------
+def _post_batch(ids, fields):
+    r = http_client.post(
+        f"{scholar.S2_API}/paper/batch",
+        params={"fields": fields},
+        json={"ids": ids},
+        limiter=rate_limit.S2_PAPER,
+        upstream="batch",
+    )
+    if r.status_code != 200:
+        raise requests.HTTPError(f"paper/batch returned {r.status_code}", response=r)
+    return r.json()
+
+async def _resolve_chunk(ids, fields, semaphore):
+    async with semaphore:
+        try:
+            papers = await asyncio.to_thread(_post_batch, ids, fields)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("Batch lookup of %d ids failed: %s", len(ids), e)
+            return [e] * len(ids)
+    # The endpoint answers positionally, with null for unknown ids
+    if len(papers) != len(ids):
+        return [ValueError("paper/batch returned a mismatched result list")] * len(ids)
+    return papers
+
+# -------------------------------------------------
+# Public API
+# -------------------------------------------------
+async def resolve_identifiers_async(entries, fields=PAPER_FIELDS,
+                                    chunk_size=BATCH_CHUNK_SIZE,
+                                    concurrency=BATCH_CONCURRENCY):
+    """Resolve a mixed list of identifiers.
+
+    Returns one ``{"input", "id", "paper", "error"}`` dict per entry (with
+    ``paper`` a parsed ``Paper``), in
+    input order. Cached papers are served without a request; duplicate ids
+    are fetched once.
+    """
+    results = [{"input": e, "id": None, "paper": None, "error": None} for e in entries]
+    pending = {}
+
+    for i, entry in enumerate(entries):
+        paper_id = classify_identifier(entry)
+        if paper_id is None:
+            results[i]["error"] = "Unrecognized identifier"
+            continue
+        results[i]["id"] = paper_id
+
+        cached = search_cache.get(lookup_cache_key(paper_id, fields))
+        metrics.record_cache("batch", "miss" if cached is None else "hit")
+        if cached is not None:
+            if cached["data"]:
+                results[i]["paper"] = Paper.from_api(cached["data"][0])
+            else:
+                results[i]["error"] = "Paper not found"
+            continue
+        pending.setdefault(paper_id, []).append(i)
+
+    ids = list(pending)
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+    resolved = await asyncio.gather(
+        *(_resolve_chunk(chunk, fields, semaphore) for chunk in chunks)
+    )
+
+    for chunk, papers in zip(chunks, resolved):
+        for paper_id, paper in zip(chunk, papers):
+            if isinstance(paper, Exception):
+                error = f"Lookup failed: {paper}"
+            elif paper is None:
+                error = "Paper not found"
+                search_cache.set(
+                    lookup_cache_key(paper_id, fields), {"data": [], "total": 0},
+                    ttl=LOOKUP_CACHE_TTL,
+                )
+            else:
+                error = None
+                search_cache.set(
+                    lookup_cache_key(paper_id, fields), {"data": [paper], "total": 1},
+                    ttl=LOOKUP_CACHE_TTL,
+                )
+
+            parsed = None if error else Paper.from_api(paper)
+            for i in pending[paper_id]:
+                results[i]["paper"] = parsed
+                results[i]["error"] = error
+
+    return results
+
+def resolve_identifiers(entries, **kwargs):
+    return asyncio.run(resolve_identifiers_async(entries, **kwargs))
@@ -0,0 +1,461 @@
+"""Offline benchmark for the search -> rank -> summarize pipeline.
+
+Recorded Semantic Scholar and Gemini responses (benchmark_fixtures/) are
+replayed by a local stand-in server, so runs need no network and can be
+compared with each other:
+
+    python benchmark.py                          # replay, print a table
+    python benchmark.py --save bench.json        # keep the results
+    python benchmark.py --compare bench.json     # show change vs. a saved run
+    python benchmark.py --latency 1              # replay recorded upstream latency
+    python benchmark.py --startup 10             # add app.py cold-start timing
+    GEMINI_API_KEY=... python benchmark.py --record   # refresh the fixtures
+
+Every scenario runs cold (caches cleared before each call) and warm.
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Keep the benchmark's caches, and the limiter, out of the way of real use.
+# Both are read at import time, so this has to happen first.
+os.environ["EXPLORER_CACHE_DIR"] = tempfile.mkdtemp(prefix="explorer-bench-")
+atexit.register(shutil.rmtree, os.environ["EXPLORER_CACHE_DIR"], ignore_errors=True)
+for name in ("S2_SEARCH_RPS", "S2_PAPER_RPS", "GEMINI_RPS"):
+    os.environ.setdefault(name, "100000")
+    os.environ.setdefault(name.replace("_RPS", "_BURST"), "100000")
+
+import requests  # noqa: E402
+
+import gemini  # noqa: E402
+import local_index  # noqa: E402
+import scholar  # noqa: E402
+from models import parse_papers  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(HERE, "benchmark_fixtures")
+APP = os.path.join(HERE, "app.py")
+
+UPSTREAMS = {
+    "s2": "https://api.semanticscholar.org",
+    "gemini": "https://generativelanguage.googleapis.com",
+}
+
+# -------------------------------------------------
+# Fixtures
+# -------------------------------------------------
+def request_key(method, path, query, body):
+    query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+    digest = hashlib.sha256(body).hexdigest()[:16] if body else None
+    return f"{method} {path}?{query} {digest}"
+
+
+class Fixtures:
+    """Recorded responses for one upstream, matched on method, path, query
+    and request-body hash.
+
+    Gemini prompts change whenever the prompt template does, so requests
+    to a known path fall back to the first response recorded there; those
+    are counted in ``fallbacks``. Unknown S2 requests get a 404 and are
+    counted in ``misses``.
+    """
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.path = os.path.join(FIXTURE_DIR, f"{upstream}.json")
+        self.entries = {}
+        self.by_path = {}
+        self.misses = []
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for entry in json.load(f)["entries"]:
+                    self._add(entry)
+
+    def _add(self, entry):
+        self.entries[entry["key"]] = entry
+        self.by_path.setdefault(entry["key"].split("?")[0], entry)
+
+    def find(self, key):
+        entry = self.entries.get(key)
+        if entry is None and self.upstream == "gemini":
+            entry = self.by_path.get(key.split("?")[0])
+            if entry is not None:
+                with self._lock:
+                    self.fallbacks += 1
+        if entry is None:
+            with self._lock:
+                self.misses.append(key)
+        return entry
+
+    def record(self, entry):
+        with self._lock:
+            self._add(entry)
+
+    def save(self):
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(
+                {"entries": sorted(self.entries.values(), key=lambda e: e["key"])},
+                f, indent=1, ensure_ascii=False,
+            )
+            f.write("\n")
+
+# -------------------------------------------------
+# Stand-in Server
+# -------------------------------------------------
+class StandIn:
+    """Serves ``/<upstream>/...`` from fixtures; with ``record`` set, misses
+    are forwarded to the real upstream and the answers kept."""
+
+    def __init__(self, latency=0.0, record=False, upstreams=UPSTREAMS):
+        self.latency = latency
+        self.record = record
+        self.upstreams = upstreams
+        self.fixtures = {name: Fixtures(name) for name in upstreams}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        if self.record:
+            for fixtures in self.fixtures.values():
+                fixtures.save()
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without this,
+            # delayed ACKs add ~40ms to every replayed call
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stand_in.serve(self, b"")
+
+            def do_POST(self):
+                stand_in.serve(self, self.rfile.read(int(self.headers.get("Content-Length", 0))))
+
+        return Handler
+
+    def serve(self, handler, body):
+        url = urlsplit(handler.path)
+        _, upstream, path = url.path.split("/", 2)
+        path = "/" + path
+        fixtures = self.fixtures.get(upstream)
+        key = request_key(handler.command, path, url.query, body)
+
+        entry = fixtures and fixtures.entries.get(key)
+        if entry is None and fixtures and self.record:
+            entry = self._forward(handler, upstream, path, url.query, body, key)
+        elif entry is None and fixtures:
+            entry = fixtures.find(key)
+
+        if entry is None:
+            payload = json.dumps({"error": f"no fixture for {key}"}).encode()
+            status, content_type = 404, "application/json"
+        else:
+            if self.latency:
+                time.sleep(entry["elapsed"] * self.latency)
+            payload = (
+                json.dumps(entry["json"]) if "json" in entry else entry["text"]
+            ).encode()
+            status, content_type = entry["status"], entry["content_type"]
+
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _forward(self, handler, upstream, path, query, body, key):
+        headers = {
+            k: v for k, v in handler.headers.items()
+            if k.lower() not in {"host", "content-length", "accept-encoding"}
+        }
+        started = time.perf_counter()
+        r = requests.request(
+            handler.command, f"{self.upstreams[upstream]}{path}",
+            params=parse_qsl(query, keep_blank_values=True), data=body or None,
+            headers=headers, timeout=60,
+        )
+        entry = {
+            "key": key,
+            "status": r.status_code,
+            "content_type": r.headers.get("Content-Type", "application/json"),
+            "elapsed": round(time.perf_counter() - started, 3),
+        }
+        if entry["content_type"].startswith("application/json"):
+            entry["json"] = r.json()
+        else:
+            entry["text"] = r.text
+        if r.status_code < 500:
+            self.fixtures[upstream].record(entry)
+        return entry
+
+# -------------------------------------------------
+# Scenarios
+# -------------------------------------------------
+DOI = "https://doi.org/10.1038/nature14539"
+S2_URL = "https://www.semanticscholar.org/paper/Attention-is-All-you-Need/204e3073870fae3d05bcbc2f6a8e263d9b72e776"
+ARXIV_URL = "https://arxiv.org/abs/1706.03762"
+PUBLISHER_URL = "https://link.springer.com/article/10.1007/s11263-015-0816-y"
+KEYWORD = "graph neural networks"
+LONG_TITLE = "Deep Residual Learning for Image Recognition"
+PAGES = 5
+PER_PAGE = 10
+
+
+def search_scenarios():
+    return {
+        "search/doi": lambda: scholar.search_papers(DOI),
+        "search/s2-url": lambda: scholar.search_papers(S2_URL),
+        "search/arxiv-url": lambda: scholar.search_papers(ARXIV_URL),
+        "search/publisher-url": lambda: scholar.search_papers(PUBLISHER_URL, limit=PER_PAGE),
+        "search/keyword": lambda: scholar.search_papers(KEYWORD, limit=PER_PAGE),
+        "search/keyword+years": lambda: scholar.search_papers(
+            KEYWORD, 2018, 2022, limit=PER_PAGE
+        ),
+        "search/long-title": lambda: scholar.search_papers(LONG_TITLE, limit=PER_PAGE),
+        "paginate/5-pages": lambda: [
+            parse_papers(scholar.search_papers(KEYWORD, limit=PER_PAGE, offset=page * PER_PAGE))
+            for page in range(PAGES)
+        ],
+    }
+
+
+def summary_scenarios(client):
+    papers = parse_papers(scholar.search_papers(KEYWORD, limit=PER_PAGE))
+    papers = [p for p in papers if p.abstract]
+    if not papers:
+        return {}
+    return {
+        "summary/single": lambda: gemini.gemini_summary(client, papers[0]),
+        "summary/stream": lambda: "".join(gemini.stream_summary(client, papers[0])),
+        "summary/page-batch": lambda: gemini.summarize_papers(client, papers),
+    }
+
+
+RENDER_SCENARIO = "render/rerun-page"
+
+
+def render_scenarios():
+    """Plain reruns of app.py with a page of keyword results on screen."""
+    from streamlit.testing.v1 import AppTest
+
+    import providers
+
+    # Dataset/code providers call live hosts with no fixtures; answer them
+    # from their disk cache, as for any page that was viewed before. The
+    # app shows local-index results first when earlier scenarios filled it,
+    # so those titles are covered too.
+    shown = scholar.search_papers(KEYWORD, limit=PER_PAGE) + scholar.search_local(
+        KEYWORD, limit=PER_PAGE
+    )
+    for paper in parse_papers(shown):
+        query = providers.build_search_query(paper.title)
+        for provider in providers.PROVIDERS:
+            providers.provider_cache.set(f"{provider.name}:{query}", [])
+    at = AppTest.from_file(APP, default_timeout=120).run()
+    at.text_input[0].set_value(KEYWORD)
+    next(b for b in at.button if "Search" in str(b.label)).click().run()
+    return {RENDER_SCENARIO: at.run}
+
+
+def clear_caches():
+    scholar.search_cache.clear()
+    gemini.summary_cache.clear()
+
+# -------------------------------------------------
+# Measurement
+# -------------------------------------------------
+def percentile(samples, q):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(fn, iterations, cold):
+    def once():
+        if cold:
+            clear_caches()
+        t = time.perf_counter()
+        fn()
+        return time.perf_counter() - t
+
+    # Peak memory comes from one traced call of its own; tracing slows
+    # Python down too much to leave it on while timing
+    if not cold:
+        fn()  # prime the caches
+    tracemalloc.start()
+    once()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    samples = [once() for _ in range(iterations)]
+    return summarize(samples, time.perf_counter() - started, peak / 1024)
+
+
+def summarize(samples, wall, peak_kb):
+    return {
+        "ops": len(samples),
+        "ops_per_s": round(len(samples) / wall, 1),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+        "peak_kb": round(peak_kb, 1),
+    }
+
+
+def run(scenarios, iterations, modes=(True, False)):
+    results = {}
+    for name, fn in scenarios.items():
+        for cold in modes:
+            label = f"{name} ({'cold' if cold else 'warm'})"
+            results[label] = measure(fn, iterations, cold)
+            print(f"  {label}", file=sys.stderr)
+    return results
+
+# -------------------------------------------------
+# Startup
+# -------------------------------------------------
+# Each sample is a fresh interpreter: the first script run pays for every
+# import the app makes, the second is what an interaction costs after that.
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+t = time.perf_counter(); at.run(); first = time.perf_counter() - t
+t = time.perf_counter(); at.run(); rerun = time.perf_counter() - t
+print(json.dumps({"first": first, "rerun": rerun,
+                  "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  "errors": [str(e.value) for e in at.exception]}))
+"""
+
+
+def measure_startup(runs):
+    samples = {"first": [], "rerun": []}
+    rss = 0
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, APP],
+            capture_output=True, text=True, check=True, cwd=HERE,
+        )
+        sample = json.loads(out.stdout.strip().splitlines()[-1])
+        if sample["errors"]:
+            raise RuntimeError(f"app.py failed to start: {sample['errors']}")
+        samples["first"].append(sample["first"])
+        samples["rerun"].append(sample["rerun"])
+        rss = max(rss, sample["rss_kb"])
+        print(f"  startup run {len(samples['first'])}/{runs}", file=sys.stderr)
+    return {
+        f"startup/{phase} (process)": summarize(times, sum(times), rss)
+        for phase, times in samples.items()
+    }
+
+# -------------------------------------------------
+# Report
+# -------------------------------------------------
+COLUMNS = ["ops_per_s", "p50_ms", "p95_ms", "p99_ms", "peak_kb"]
+
+
+def report(results, baseline=None):
+    width = max(len(name) for name in results)
+    print(f"{'scenario':<{width}}  " + "  ".join(f"{c:>16}" for c in COLUMNS))
+    for name, row in results.items():
+        cells = []
+        for column in COLUMNS:
+            cell = f"{row[column]:.1f}"
+            before = (baseline or {}).get(name, {}).get(column)
+            if before:
+                cell += f" ({(row[column] - before) / before:+.0%})"
+            cells.append(f"{cell:>16}")
+        print(f"{name:<{width}}  " + "  ".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--iterations", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="replay this fraction of the recorded upstream latency")
+    parser.add_argument("--record", action="store_true",
+                        help="forward unrecorded requests upstream and save them")
+    parser.add_argument("--upstream", action="append", default=[], metavar="NAME=URL",
+                        help="record from another host, e.g. s2=http://localhost:8000")
+    parser.add_argument("--only", help="run only scenarios containing this text")
+    parser.add_argument("--startup", type=int, default=0, metavar="RUNS",
+                        help="also time app.py cold start over this many fresh processes")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="show the change against a saved JSON file")
+    args = parser.parse_args(argv)
+
+    from google import genai
+
+    upstreams = dict(UPSTREAMS, **dict(u.split("=", 1) for u in args.upstream))
+    stand_in = StandIn(latency=args.latency, record=args.record, upstreams=upstreams)
+    scholar.S2_API = f"{stand_in.url}/s2/graph/v1"
+    client = genai.Client(
+        api_key=os.getenv("GEMINI_API_KEY", "offline"),
+        http_options={"base_url": f"{stand_in.url}/gemini"},
+    )
+
+    try:
+        scenarios = search_scenarios()
+        scenarios.update(summary_scenarios(client))
+        if args.only:
+            scenarios = {k: v for k, v in scenarios.items() if args.only in k}
+        results = run(scenarios, 1 if args.record else args.iterations)
+        if not args.record and (not args.only or args.only in RENDER_SCENARIO):
+            # Reruns keep their session state, so only the warm case exists
+            results.update(run(render_scenarios(), args.iterations, modes=(False,)))
+    finally:
+        stand_in.close()
+    if args.startup:
+        results.update(measure_startup(args.startup))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    report(results, baseline)
+
+    fixtures = stand_in.fixtures
+    print(
+        f"\npeak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+        f" · local index {local_index.index_size()} papers"
+        f" · gemini fixture fallbacks {fixtures['gemini'].fallbacks}"
+    )
+    misses = sorted({key for f in fixtures.values() for key in f.misses})
+    if misses:
+        print(f"{len(misses)} requests had no fixture:", *misses, sep="\n  ")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"iterations": args.iterations, "latency": args.latency,
+                       "results": results}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
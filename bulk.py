@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+import os
+
+from cache import CACHE_DIR
+from scholar import PAPER_FIELDS, fetch_bulk_batch, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Bulk Search Settings
+# -------------------------------------------------
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "bulk")
+
+
+class BulkSearchError(Exception):
+    pass
+
+# -------------------------------------------------
+# Resumable Checkpoints
+# -------------------------------------------------
+class BulkCheckpoint:
+    """Where a bulk run stopped: the token of the batch being read, how many
+    papers of that batch were already yielded, and the running total."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.token = None
+        self.skip = 0
+        self.count = 0
+        self.done = False
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.token = state["token"]
+            self.skip = state["skip"]
+            self.count = state["count"]
+            self.done = state["done"]
+
+    @classmethod
+    def for_search(cls, query, from_year=None, to_year=None, sort=None, fields=PAPER_FIELDS):
+        key = json.dumps([normalize_query(query), from_year, to_year, sort, fields])
+        name = hashlib.sha256(key.encode()).hexdigest()[:16]
+        return cls(os.path.join(CHECKPOINT_DIR, f"{name}.json"))
+
+    @property
+    def started(self):
+        return self.count > 0
+
+    @property
+    def export_path(self):
+        # Papers streamed so far, kept in step with the checkpoint
+        return os.path.splitext(self.path)[0] + ".jsonl"
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(
+                {"token": self.token, "skip": self.skip, "count": self.count, "done": self.done}, f
+            )
+        # Atomic replace, so an interrupted write never corrupts the checkpoint
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        for path in (self.path, self.export_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.token, self.skip, self.count, self.done = None, 0, 0, False
+
+# -------------------------------------------------
+# Streaming Bulk Search
+# -------------------------------------------------
+def iter_bulk_search(query, from_year=None, to_year=None, sort=None,
+                     fields=PAPER_FIELDS, max_papers=None, checkpoint=None):
+    """Yield every paper matching ``query`` from /paper/search/bulk.
+
+    Only one batch (at most 1,000 papers) is held at a time. With a
+    ``checkpoint`` the walk resumes where the last run stopped and the
+    position is saved after every batch and whenever the consumer stops.
+    Raises ``BulkSearchError`` if a batch cannot be fetched; the checkpoint
+    then still points at that batch.
+    """
+    if checkpoint and checkpoint.done:
+        return
+
+    token = checkpoint.token if checkpoint else None
+    skip = checkpoint.skip if checkpoint else 0
+    count = checkpoint.count if checkpoint else 0
+
+    def save(batch_token, yielded_in_batch, done=False):
+        if checkpoint:
+            checkpoint.token, checkpoint.skip = batch_token, yielded_in_batch
+            checkpoint.count, checkpoint.done = count, done
+            checkpoint.save()
+
+    yielded_in_batch = skip
+    try:
+        while True:
+            body = fetch_bulk_batch(query, from_year, to_year, sort, token, fields)
+            if body is None:
+                raise BulkSearchError(f"Bulk search failed after {count} papers")
+
+            yielded_in_batch = skip
+            for paper in body.get("data", [])[skip:]:
+                if max_papers is not None and count >= max_papers:
+                    return
+                count += 1
+                yielded_in_batch += 1
+                yield paper
+
+            token, skip, yielded_in_batch = body.get("token"), 0, 0
+            if not token:
+                save(None, 0, done=True)
+                return
+            save(token, 0)
+    finally:
+        # Covers max_papers, errors and consumers that stop early
+        if checkpoint and not checkpoint.done:
+            save(token, yielded_in_batch)
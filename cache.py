@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# -------------------------------------------------
+# Cache Location
+# -------------------------------------------------
+# One directory shared by every Streamlit session and worker process.
+CACHE_DIR = os.getenv("EXPLORER_CACHE_DIR", ".cache")
+
+
+# -------------------------------------------------
+# SQLite-backed TTL + LRU Cache
+# -------------------------------------------------
+class DiskCache:
+    """Persistent key/value store with per-entry TTL and LRU eviction.
+
+    Values are stored as JSON. Hit/miss counters live in the same database
+    so they add up across sessions and processes.
+    """
+
+    def __init__(self, name, max_entries=2000, default_ttl=3600):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.path = os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)"
+        )
+
+    def _count(self, name):
+        self._conn.execute(
+            "UPDATE counters SET value = value + 1 WHERE name = ?", (name,)
+        )
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._count("misses")
+                return default
+
+            self._conn.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._count("hits")
+        return json.loads(row[0])
+
+    def get_with_age(self, key, default=None):
+        """Like ``get`` but returns ``(value, age_in_seconds)``.
+
+        The age lets callers treat an unexpired entry as stale and serve it
+        while they refresh it.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or row[2] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._count("misses")
+                return default, None
+
+            self._conn.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._count("hits")
+        return json.loads(row[0]), now - row[1]
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), now, now + ttl, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM entries WHERE expires < ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            # Least recently used entries go first
+            self._conn.execute(
+                """DELETE FROM entries WHERE key IN (
+                    SELECT key FROM entries ORDER BY accessed ASC LIMIT ?
+                )""",
+                (overflow,),
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("UPDATE counters SET value = 0")
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters"))
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
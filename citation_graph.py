@@ -0,0 +1,288 @@
+import json
+import logging
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_client
+import rate_limit
+import scholar
+from cache import DiskCache
+from models import Paper
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Graph Settings
+# -------------------------------------------------
+# Neighbours only need enough to label and rank a node
+GRAPH_FIELDS = "paperId,title,year,citationCount"
+
+# Most a /references or /citations call returns at once
+EDGE_PAGE_LIMIT = 1000
+MAX_NEIGHBORS = 1000
+MAX_GRAPH_NODES = 5000
+# Papers whose own edges are fetched; at the default rate limit each one
+# is a request or more, so this is what bounds a deep expansion
+MAX_EXPANSIONS = 200
+# Longest a walk may take; expansions are also capped to what the paper
+# lookup rate limit allows in this time
+GRAPH_TIME_BUDGET = 60
+GRAPH_CONCURRENCY = 8
+
+# Endpoint -> key holding the neighbouring paper in each returned item
+DIRECTIONS = {"references": "citedPaper", "citations": "citingPaper"}
+
+# -------------------------------------------------
+# Edge Cache
+# -------------------------------------------------
+# A paper's reference list is fixed once published; citations keep arriving
+REFERENCES_TTL = 30 * 24 * 60 * 60
+CITATIONS_TTL = 24 * 60 * 60
+
+edge_cache = DiskCache("citations", max_entries=20000, default_ttl=CITATIONS_TTL)
+
+_executor = ThreadPoolExecutor(max_workers=GRAPH_CONCURRENCY, thread_name_prefix="graph")
+
+def edge_cache_key(paper_id, direction, fields=GRAPH_FIELDS):
+    return json.dumps([direction, paper_id, fields])
+
+def fetch_neighbors(paper_id, direction, max_neighbors=MAX_NEIGHBORS):
+    """Papers on the other end of ``paper_id``'s references or citations,
+    paging through the endpoint up to ``max_neighbors``. None on failure."""
+    key = edge_cache_key(paper_id, direction)
+    cached = edge_cache.get(key)
+    if cached is not None and (cached["complete"] or len(cached["data"]) >= max_neighbors):
+        return cached["data"][:max_neighbors]
+
+    neighbors, offset, complete = [], 0, False
+    try:
+        while len(neighbors) < max_neighbors:
+            r = http_client.get(
+                f"{scholar.S2_API}/paper/{paper_id}/{direction}",
+                params={
+                    "fields": GRAPH_FIELDS,
+                    "offset": offset,
+                    "limit": min(EDGE_PAGE_LIMIT, max_neighbors - len(neighbors)),
+                },
+                limiter=rate_limit.S2_PAPER,
+                upstream=direction,
+            )
+            if r.status_code == 404:
+                complete = True
+                break
+            if r.status_code != 200:
+                logger.warning("%s returned %s for %s", direction, r.status_code, paper_id)
+                return None
+
+            body = r.json()
+            data = body.get("data") or []
+            for item in data:
+                paper = item.get(DIRECTIONS[direction])
+                # Unresolved references come back without a paperId
+                if paper and paper.get("paperId"):
+                    neighbors.append(paper)
+            if not data or body.get("next") is None:
+                complete = True
+                break
+            offset = body["next"]
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("%s failed for %s: %s", direction, paper_id, e)
+        return None
+
+    ttl = REFERENCES_TTL if direction == "references" else CITATIONS_TTL
+    edge_cache.set(key, {"data": neighbors, "complete": complete}, ttl=ttl)
+    return neighbors
+
+# -------------------------------------------------
+# Compact Graph
+# -------------------------------------------------
+class CitationGraph:
+    """Papers as dense integer ids, edges as flat arrays.
+
+    ``index`` maps a paperId to its position in ``ids`` and the parallel
+    ``titles``/``years``/``citations``/``depths`` columns. Each edge is
+    stored once as ``citing[i] -> cited[i]``; per-node neighbour lists are
+    built on demand in compressed (offsets + targets) form.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.index = {}
+        self.titles = []
+        self.years = array("h")
+        self.citations = array("q")
+        self.depths = array("b")
+        self.citing = array("l")
+        self.cited = array("l")
+        self.failed = []
+        self.truncated = False
+        self._edges = set()
+        self._adjacency = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.citing)
+
+    def add_node(self, paper, depth):
+        """Return ``(node, added)``; a known paper keeps its first depth."""
+        paper_id = paper["paperId"]
+        node = self.index.get(paper_id)
+        if node is not None:
+            return node, False
+        node = self.index[paper_id] = len(self.ids)
+        self.ids.append(paper_id)
+        self.titles.append(paper.get("title") or "")
+        self.years.append(paper.get("year") or 0)
+        self.citations.append(paper.get("citationCount") or 0)
+        self.depths.append(depth)
+        return node, True
+
+    def add_edge(self, citing, cited):
+        key = citing << 32 | cited
+        if key in self._edges:
+            return
+        self._edges.add(key)
+        self.citing.append(citing)
+        self.cited.append(cited)
+        self._adjacency = None
+
+    def _build(self, sources, targets):
+        offsets = array("l", [0] * (len(self.ids) + 1))
+        for s in sources:
+            offsets[s + 1] += 1
+        for i in range(len(self.ids)):
+            offsets[i + 1] += offsets[i]
+        fill = array("l", offsets[:-1])
+        out = array("l", [0] * len(sources))
+        for s, t in zip(sources, targets):
+            out[fill[s]] = t
+            fill[s] += 1
+        return offsets, out
+
+    def _lists(self):
+        if self._adjacency is None:
+            self._adjacency = (
+                self._build(self.citing, self.cited),
+                self._build(self.cited, self.citing),
+            )
+        return self._adjacency
+
+    def references(self, node):
+        (offsets, targets), _ = self._lists()
+        return targets[offsets[node]:offsets[node + 1]]
+
+    def cited_by(self, node):
+        _, (offsets, sources) = self._lists()
+        return sources[offsets[node]:offsets[node + 1]]
+
+    def degree(self, node):
+        (out_offsets, _), (in_offsets, _) = self._lists()
+        return (out_offsets[node + 1] - out_offsets[node]
+                + in_offsets[node + 1] - in_offsets[node])
+
+    def node(self, node):
+        return {
+            "paperId": self.ids[node],
+            "title": self.titles[node],
+            "year": self.years[node] or None,
+            "citationCount": self.citations[node],
+            "depth": self.depths[node],
+            "links": self.degree(node),
+        }
+
+    def top_nodes(self, limit=20):
+        """Best-connected papers around the seed (the seed itself excluded)."""
+        ranked = sorted(
+            range(1, len(self.ids)),
+            key=lambda n: (self.degree(n), self.citations[n]),
+            reverse=True,
+        )
+        return [self.node(n) for n in ranked[:limit]]
+
+# -------------------------------------------------
+# Bounded-depth BFS
+# -------------------------------------------------
+_SKIPPED = object()
+
+def expansion_budget(requests_per_paper, time_budget=GRAPH_TIME_BUDGET):
+    """Papers that can be expanded within ``time_budget`` seconds at the
+    paper lookup rate limit, assuming nothing is cached."""
+    limiter = rate_limit.S2_PAPER
+    return max(1, int((limiter.capacity + limiter.rate * time_budget) // requests_per_paper))
+
+def expand_graph(seed, depth=1, direction="both", max_neighbors=MAX_NEIGHBORS,
+                 max_nodes=MAX_GRAPH_NODES, max_expansions=MAX_EXPANSIONS,
+                 time_budget=GRAPH_TIME_BUDGET):
+    """Walk references and/or citations out from ``seed`` (a paper returned
+    by ``search_papers``) to ``depth`` hops.
+
+    Each level's papers are fetched concurrently, most-cited first, until
+    ``max_expansions`` papers (fewer if the rate limit allows less within
+    ``time_budget`` seconds) have been expanded. New papers stop being
+    added at ``max_nodes``, and papers not reached before the time budget
+    runs out are left unexpanded; any of these limits sets ``truncated``. Papers whose
+    edges could not be fetched are listed in ``failed``.
+
+    Requests are made at background priority, so a walk never holds up
+    other sessions' lookups.
+    """
+    seed = Paper.coerce(seed)
+    directions = list(DIRECTIONS) if direction == "both" else [direction]
+    max_expansions = min(max_expansions, expansion_budget(len(directions), time_budget))
+    deadline = time.monotonic() + time_budget
+    graph = CitationGraph()
+    root, _ = graph.add_node(
+        {"paperId": seed.paper_id, "title": seed.title, "year": seed.year,
+         "citationCount": seed.citations},
+        0,
+    )
+
+    frontier = [root]
+    expanded = 0
+    for level in range(1, depth + 1):
+        frontier.sort(key=lambda n: graph.citations[n], reverse=True)
+        allowed = max(0, max_expansions - expanded)
+        if len(frontier) > allowed:
+            graph.truncated = True
+            frontier = frontier[:allowed]
+        if not frontier:
+            break
+        expanded += len(frontier)
+
+        def fetch(job):
+            if time.monotonic() >= deadline:
+                return _SKIPPED
+            # Pool threads don't inherit the caller's priority, so set it here
+            return rate_limit.run_in_background(fetch_neighbors, job[1], job[2], max_neighbors)
+
+        jobs = [(node, graph.ids[node], d) for node in frontier for d in directions]
+        results = _executor.map(fetch, jobs)
+
+        frontier = []
+        for (node, paper_id, d), neighbors in zip(jobs, results):
+            if neighbors is _SKIPPED:
+                graph.truncated = True
+                continue
+            if neighbors is None:
+                graph.failed.append(paper_id)
+                continue
+            for paper in neighbors:
+                if len(graph) >= max_nodes and paper["paperId"] not in graph.index:
+                    graph.truncated = True
+                    continue
+                other, added = graph.add_node(paper, level)
+                if other == node:
+                    continue
+                if d == "references":
+                    graph.add_edge(node, other)
+                else:
+                    graph.add_edge(other, node)
+                if added:
+                    frontier.append(other)
+    return graph
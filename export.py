@@ -0,0 +1,142 @@
+import csv
+import json
+import os
+
+from models import Paper
+
+# -------------------------------------------------
+# Export Settings
+# -------------------------------------------------
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# Rows buffered per Parquet row group (and per CSV flush)
+EXPORT_CHUNK_SIZE = 5000
+
+COLUMNS = ["paperId", "Title", "Authors", "Year", "Citations", "Venue", "Abstract", "URL"]
+
+def paper_row(paper):
+    p = Paper.coerce(paper)
+    return {
+        "paperId": p.paper_id,
+        "Title": p.title,
+        "Authors": p.authors,
+        "Year": p.year,
+        "Citations": p.citations,
+        "Venue": p.venue,
+        "Abstract": p.abstract,
+        "URL": p.url,
+    }
+
+# -------------------------------------------------
+# Streaming Writers
+# -------------------------------------------------
+class CsvWriter:
+    def __init__(self, path, append=False):
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "a" if append else "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        if not exists:
+            self._writer.writeheader()
+        self._pending = 0
+
+    def write(self, paper):
+        self._writer.writerow(paper_row(paper))
+        self._pending += 1
+        if self._pending >= EXPORT_CHUNK_SIZE:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlWriter:
+    def __init__(self, path, append=False):
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, paper):
+        data = paper.to_dict() if isinstance(paper, Paper) else paper
+        self._file.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Columnar writer: rows are buffered into one row group at a time."""
+
+    def __init__(self, path, append=False):
+        if append:
+            raise ValueError("Parquet exports cannot be appended to")
+        # Optional dependency, only needed for Parquet
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("paperId", pa.string()),
+            ("Title", pa.string()),
+            ("Authors", pa.string()),
+            ("Year", pa.int32()),
+            ("Citations", pa.int64()),
+            ("Venue", pa.string()),
+            ("Abstract", pa.string()),
+            ("URL", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+        self._columns = {name: [] for name in COLUMNS}
+        self._rows = 0
+
+    def write(self, paper):
+        for name, value in paper_row(paper).items():
+            self._columns[name].append(value)
+        self._rows += 1
+        if self._rows >= EXPORT_CHUNK_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            table = self._pa.Table.from_pydict(self._columns, schema=self._schema)
+            self._writer.write_table(table)
+            self._columns = {name: [] for name in COLUMNS}
+            self._rows = 0
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+WRITERS = {"CSV": CsvWriter, "JSONL": JsonlWriter, "Parquet": ParquetWriter}
+
+def open_writer(fmt, path, append=False):
+    return WRITERS[fmt](path, append=append)
+
+# -------------------------------------------------
+# Export Helpers
+# -------------------------------------------------
+def export_papers(papers, path, fmt="CSV"):
+    """Stream any iterable of papers (``Paper`` or API dicts) to ``path``;
+    returns the row count."""
+    writer = open_writer(fmt, path)
+    count = 0
+    try:
+        for paper in papers:
+            writer.write(paper)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+def iter_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def convert_jsonl(src, dest, fmt):
+    """Re-encode a JSONL export as CSV/Parquet without loading it whole."""
+    return export_papers(iter_jsonl(src), dest, fmt)
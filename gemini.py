@@ -0,0 +1,316 @@
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import rate_limit
+from cache import DiskCache
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Gemini Settings
+# -------------------------------------------------
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# -------------------------------------------------
+# Prompt
+# -------------------------------------------------
+SUMMARY_PROMPT = """
+Summarize the paper academically.
+
+Title: {title}
+Abstract: {abstract}
+
+Provide:
+- Methods
+- Pros
+- Cons
+- Open research problems
+"""
+
+# Any edit to the template yields a new version, so old summaries stop matching
+PROMPT_VERSION = hashlib.sha256(SUMMARY_PROMPT.encode()).hexdigest()[:12]
+
+def summary_prompt(paper):
+    return SUMMARY_PROMPT.format(title=paper.title, abstract=paper.abstract)
+
+# -------------------------------------------------
+# Summary Cache
+# -------------------------------------------------
+SUMMARY_CACHE_TTL = 30 * 24 * 60 * 60
+
+summary_cache = DiskCache("summaries", max_entries=20000, default_ttl=SUMMARY_CACHE_TTL)
+
+# Concurrent requests for the same summary share one generation
+summary_flight = SingleFlight()
+
+def paper_key(paper):
+    if paper.paper_id:
+        return paper.paper_id
+    content = f"{paper.title}\n{paper.abstract or ''}"
+    return "sha256:" + hashlib.sha256(content.encode()).hexdigest()
+
+def summary_cache_key(paper, model=None, prompt_version=PROMPT_VERSION):
+    return json.dumps([prompt_version, model or GEMINI_MODEL, paper_key(paper)])
+
+def invalidate_summaries(prompt_version=None):
+    """Drop cached summaries for one prompt version, or all of them."""
+    if prompt_version is None:
+        summary_cache.clear()
+    else:
+        summary_cache.delete_prefix(json.dumps([prompt_version])[:-1])
+
+# -------------------------------------------------
+# Gemini Summary
+# -------------------------------------------------
+def gemini_summary(client, paper):
+    if not client or not paper.abstract:
+        return "⚠️ Gemini unavailable or abstract missing."
+
+    key = summary_cache_key(paper)
+    cached = summary_cache.get(key)
+    metrics.record_cache("gemini", "miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+
+    try:
+        return summary_flight.do(key, _generate_summary, client, paper, key)
+    except Exception as e:
+        return f"⚠️ Gemini error: {e}"
+
+def _generate_summary(client, paper, key):
+    res = _generate(client, summary_prompt(paper))
+    summary_cache.set(key, res.text)
+    return res.text
+
+def _generate(client, contents, **kwargs):
+    """One rate-limited generate_content call, recorded in metrics."""
+    started = time.perf_counter()
+    try:
+        with rate_limit.GEMINI:
+            res = client.models.generate_content(
+                model=GEMINI_MODEL, contents=contents, **kwargs
+            )
+    except Exception:
+        metrics.record_call("gemini", time.perf_counter() - started, "error")
+        raise
+    metrics.record_call(
+        "gemini", time.perf_counter() - started, "ok", len((res.text or "").encode())
+    )
+    return res
+
+# -------------------------------------------------
+# Streaming Gemini Summary
+# -------------------------------------------------
+class SummaryStream:
+    """Iterate to receive summary text chunks as the model produces them.
+
+    After iteration ``text`` holds the full summary, ``first_token`` the
+    time-to-first-token and ``total`` the whole generation time (seconds).
+    Cached summaries are yielded in one piece with ``cached`` set.
+    """
+
+    def __init__(self, client, paper):
+        self.client = client
+        self.paper = paper
+        self.text = ""
+        self.first_token = None
+        self.total = None
+        self.error = None
+        self.cached = False
+
+    def __iter__(self):
+        if not self.client or not self.paper.abstract:
+            self.text = "⚠️ Gemini unavailable or abstract missing."
+            yield self.text
+            return
+
+        started = time.perf_counter()
+        key = summary_cache_key(self.paper)
+        cached = summary_cache.get(key)
+        if cached is None:
+            # A page-level batch summary is just as good
+            cached = summary_cache.get(
+                summary_cache_key(self.paper, prompt_version=BATCH_PROMPT_VERSION)
+            )
+        metrics.record_cache("gemini", "miss" if cached is None else "hit")
+        if cached is not None:
+            self.cached = True
+            self.text = cached
+            self.first_token = self.total = time.perf_counter() - started
+            yield cached
+            return
+
+        # Someone else is already generating this summary: wait and share it
+        future, leader = summary_flight.claim(key)
+        if not leader:
+            try:
+                self.text = future.result()
+            except Exception as e:
+                self.error = e
+                self.text = f"⚠️ Gemini error: {e}"
+            self.first_token = self.total = time.perf_counter() - started
+            yield self.text
+            return
+
+        error = None
+        try:
+            if not rate_limit.GEMINI.acquire():
+                raise rate_limit.RateLimitTimeout("Timed out waiting for the Gemini rate limit")
+            for chunk in self.client.models.generate_content_stream(
+                model=GEMINI_MODEL,
+                contents=summary_prompt(self.paper)
+            ):
+                if not chunk.text:
+                    continue
+                if self.first_token is None:
+                    self.first_token = time.perf_counter() - started
+                self.text += chunk.text
+                yield chunk.text
+            summary_cache.set(key, self.text)
+        except Exception as e:
+            self.error = error = e
+            message = f"\n\n⚠️ Gemini error: {e}"
+            self.text += message
+            yield message
+        except GeneratorExit:
+            error = RuntimeError("summary stream was abandoned")
+            raise
+        finally:
+            summary_flight.finish(key, future, self.text, error)
+            self.total = time.perf_counter() - started
+            metrics.record_call(
+                "gemini", self.total, "error" if error else "ok", len(self.text.encode())
+            )
+            if self.first_token is not None:
+                metrics.METRICS.observe("gemini_first_token_seconds", self.first_token)
+            logger.info(
+                "Gemini summary: first token %.2fs, total %.2fs",
+                self.first_token or 0.0, self.total
+            )
+
+def stream_summary(client, paper):
+    return SummaryStream(client, paper)
+
+# -------------------------------------------------
+# Batched Page Summaries
+# -------------------------------------------------
+BATCH_TOKEN_BUDGET = 8000
+BATCH_MAX_PAPERS = 10
+BATCH_CONCURRENCY = 4
+
+BATCH_PROMPT = """
+You are a research assistant. Summarize each paper below academically.
+
+STRICT RULES:
+- Use ONLY the provided title and abstract of each paper
+- Do NOT invent information
+- Answer with a JSON array containing one object per paper, in any order:
+  {{"id": "<paper id>", "methods": "...", "pros": "...", "cons": "...", "open_problems": "..."}}
+
+PAPERS:
+{papers}
+"""
+
+BATCH_PROMPT_VERSION = hashlib.sha256(BATCH_PROMPT.encode()).hexdigest()[:12]
+
+BATCH_SECTIONS = [
+    ("methods", "Methods"),
+    ("pros", "Pros"),
+    ("cons", "Cons"),
+    ("open_problems", "Open research problems"),
+]
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English prose
+    return len(text) // 4 + 1
+
+def _paper_block(ref, paper):
+    return f"\n[{ref}]\nTitle: {paper.title}\nAbstract: {paper.abstract}\n"
+
+def pack_papers(papers, token_budget=BATCH_TOKEN_BUDGET, max_papers=BATCH_MAX_PAPERS):
+    """Greedily group papers so each group's prompt stays within the budget."""
+    overhead = estimate_tokens(BATCH_PROMPT)
+    batches, current, used = [], [], overhead
+    for paper in papers:
+        cost = estimate_tokens(_paper_block("P00", paper))
+        if current and (used + cost > token_budget or len(current) >= max_papers):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(paper)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def format_sections(sections):
+    return "\n\n".join(
+        f"**{label}:** {sections.get(field) or 'Not stated.'}"
+        for field, label in BATCH_SECTIONS
+    )
+
+def parse_batch_response(text, refs):
+    """Split the model's JSON answer back into per-paper markdown."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    items = json.loads(text)
+    by_ref = {str(item.get("id", "")).strip("[] "): item for item in items if isinstance(item, dict)}
+    return {ref: format_sections(by_ref[ref]) for ref in refs if ref in by_ref}
+
+def _summarize_batch(client, batch):
+    refs = [f"P{i + 1}" for i in range(len(batch))]
+    prompt = BATCH_PROMPT.format(
+        papers="".join(_paper_block(ref, paper) for ref, paper in zip(refs, batch))
+    )
+    res = _generate(client, prompt, config={"response_mime_type": "application/json"})
+    parsed = parse_batch_response(res.text, refs)
+    return [parsed.get(ref) for ref in refs]
+
+def summarize_papers(client, papers, token_budget=BATCH_TOKEN_BUDGET):
+    """Summarize many papers in as few model calls as the budget allows.
+
+    Returns one markdown summary per paper, in order, with None where
+    no summary could be made (no client or abstract, or the model call
+    failed). Cached summaries are reused and new ones are cached.
+    """
+    results = [None] * len(papers)
+    todo = []
+    for i, paper in enumerate(papers):
+        if not client or not paper.abstract:
+            continue
+        cached = summary_cache.get(summary_cache_key(paper, prompt_version=BATCH_PROMPT_VERSION))
+        metrics.record_cache("gemini", "miss" if cached is None else "hit")
+        if cached is not None:
+            results[i] = cached
+        else:
+            todo.append(i)
+
+    batches = pack_papers([papers[i] for i in todo], token_budget)
+    if batches:
+        with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as pool:
+            futures = [pool.submit(_summarize_batch, client, batch) for batch in batches]
+
+        offset = 0
+        for batch, future in zip(batches, futures):
+            indices = todo[offset:offset + len(batch)]
+            offset += len(batch)
+            try:
+                summaries = future.result()
+            except Exception as e:
+                logger.warning("Batch summary of %d papers failed: %s", len(batch), e)
+                continue
+
+            for i, summary in zip(indices, summaries):
+                if summary is None:
+                    continue
+                summary_cache.set(
+                    summary_cache_key(papers[i], prompt_version=BATCH_PROMPT_VERSION), summary
+                )
+                results[i] = summary
+
+    return results
@@ -0,0 +1,127 @@
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Client Settings (override via environment)
+# -------------------------------------------------
+CONNECT_TIMEOUT = float(os.getenv("S2_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("S2_READ_TIMEOUT", "10"))
+MAX_RETRIES = int(os.getenv("S2_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("S2_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("S2_BACKOFF_MAX", "20"))
+POOL_SIZE = int(os.getenv("S2_POOL_SIZE", "32"))
+
+S2_API_KEY = os.getenv("S2_API_KEY")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# -------------------------------------------------
+# Process-wide Pooled Session
+# -------------------------------------------------
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Keep-alive connections are reused across sessions and threads
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = "AI-Research-Explorer"
+                if S2_API_KEY:
+                    session.headers["x-api-key"] = S2_API_KEY
+                _session = session
+    return _session
+
+# -------------------------------------------------
+# Backoff Helpers
+# -------------------------------------------------
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt):
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+# -------------------------------------------------
+# Requests with Retry
+# -------------------------------------------------
+def request(method, url, timeout=None, max_retries=None, limiter=None, upstream=None,
+            **kwargs):
+    """Send a request through the shared session, retrying 429/5xx and
+    connection errors. Returns the final response; raises the last
+    ``requests.RequestException`` if every attempt failed to connect.
+
+    With a ``limiter`` (see rate_limit.py) every attempt first waits for a
+    token; ``requests.Timeout`` is raised if the queue deadline passes.
+    Each call is recorded in metrics.py under ``upstream`` (default: host).
+    """
+    session = get_session()
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    upstream = upstream or url.split("/")[2]
+    start = time.perf_counter()
+
+    for attempt in range(max_retries + 1):
+        if limiter is not None and not limiter.acquire():
+            metrics.record_call(
+                upstream, time.perf_counter() - start, "rate_limited", retries=attempt
+            )
+            raise requests.Timeout(f"Timed out waiting for the {limiter.name} rate limit")
+        try:
+            r = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == max_retries:
+                metrics.record_call(
+                    upstream, time.perf_counter() - start, "error", retries=attempt
+                )
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("%s %s failed (%s), retrying in %.1fs", method, url, e, delay)
+        else:
+            if r.status_code not in RETRY_STATUSES or attempt == max_retries:
+                metrics.record_call(
+                    upstream, time.perf_counter() - start, r.status_code, len(r.content),
+                    retries=attempt,
+                )
+                return r
+            delay = retry_after_seconds(r)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            delay = min(delay, BACKOFF_MAX)
+            logger.warning(
+                "%s %s returned %s, retrying in %.1fs", method, url, r.status_code, delay
+            )
+            r.close()
+        time.sleep(delay)
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
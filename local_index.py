@@ -0,0 +1,123 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from cache import CACHE_DIR
+
+# -------------------------------------------------
+# Local Full-text Index (SQLite FTS5)
+# -------------------------------------------------
+# Every paper search_papers returns is indexed here, so warm queries can be
+# answered locally (and still work while the API is down or throttling).
+INDEX_PATH = os.path.join(CACHE_DIR, "index.sqlite3")
+
+# bm25 column weights: title, abstract, authors, venue
+BM25_WEIGHTS = (10.0, 1.0, 5.0, 2.0)
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_lock = threading.Lock()
+_conn = None
+
+def _connect():
+    global _conn
+    if _conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(
+            INDEX_PATH, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS papers (
+                paper_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                year INTEGER,
+                updated REAL NOT NULL
+            )"""
+        )
+        conn.execute(
+            """CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                title, abstract, authors, venue,
+                paper_id UNINDEXED,
+                tokenize = 'porter unicode61 remove_diacritics 2'
+            )"""
+        )
+        _conn = conn
+    return _conn
+
+# -------------------------------------------------
+# Incremental Updates
+# -------------------------------------------------
+def add_papers(papers):
+    papers = [p for p in papers if p.get("paperId") and p.get("title")]
+    if not papers:
+        return
+
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        conn.execute("BEGIN")
+        try:
+            for p in papers:
+                data = {k: v for k, v in p.items() if not k.startswith("_")}
+                conn.execute(
+                    "INSERT OR REPLACE INTO papers VALUES (?, ?, ?, ?)",
+                    (p["paperId"], json.dumps(data), p.get("year"), now),
+                )
+                conn.execute("DELETE FROM papers_fts WHERE paper_id = ?", (p["paperId"],))
+                conn.execute(
+                    "INSERT INTO papers_fts VALUES (?, ?, ?, ?, ?)",
+                    (
+                        p.get("title") or "",
+                        p.get("abstract") or "",
+                        " ".join(a.get("name") or "" for a in p.get("authors") or []),
+                        p.get("venue") or "",
+                        p["paperId"],
+                    ),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+# -------------------------------------------------
+# Local Search
+# -------------------------------------------------
+def _match_expression(query, operator):
+    tokens = TOKEN.findall(query.lower())
+    return f" {operator} ".join(f'"{t}"' for t in tokens)
+
+def search_local(query, from_year=None, to_year=None, limit=25):
+    """Return up to ``limit`` indexed papers ranked by weighted BM25.
+
+    All query words must match; if that finds nothing, any word may.
+    """
+    sql = f"""
+        SELECT p.data FROM papers_fts
+        JOIN papers p ON p.paper_id = papers_fts.paper_id
+        WHERE papers_fts MATCH ?
+        {"AND p.year BETWEEN ? AND ?" if from_year and to_year else ""}
+        ORDER BY bm25(papers_fts, {", ".join(map(str, BM25_WEIGHTS))})
+        LIMIT ?
+    """
+    year_args = (from_year, to_year) if from_year and to_year else ()
+
+    with _lock:
+        conn = _connect()
+        for operator in ("AND", "OR"):
+            expression = _match_expression(query, operator)
+            if not expression:
+                return []
+            rows = conn.execute(sql, (expression, *year_args, limit)).fetchall()
+            if rows:
+                return [json.loads(data) for (data,) in rows]
+    return []
+
+def index_size():
+    with _lock:
+        (count,) = _connect().execute("SELECT COUNT(*) FROM papers").fetchone()
+    return count
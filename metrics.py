@@ -0,0 +1,310 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Settings (override via environment)
+# -------------------------------------------------
+# Text-format snapshot for a node_exporter textfile collector or a quick look
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join(CACHE_DIR, "metrics.prom"))
+# Set to serve /metrics over HTTP for Prometheus to scrape
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+HELP = {
+    "upstream_request_seconds": "Upstream call latency, including retries and rate-limit waits.",
+    "upstream_responses_total": "Upstream calls by final HTTP status (or error).",
+    "upstream_retries_total": "Upstream attempts that were retried.",
+    "upstream_response_bytes": "Upstream response payload size.",
+    "cache_lookups_total": "Cache lookups by result (hit, stale, miss).",
+    "rerun_phase_seconds": "Time spent in each phase of a Streamlit rerun.",
+    "gemini_first_token_seconds": "Time to the first streamed Gemini summary chunk.",
+}
+
+# -------------------------------------------------
+# Metric Types
+# -------------------------------------------------
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+
+class Registry:
+    """Process-wide counters and histograms, keyed by name and labels.
+
+    Every Streamlit session is a thread of the same process, so one
+    registry sees all of them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counters(self, name):
+        """``{labels: value}`` for one counter."""
+        with self._lock:
+            return {
+                labels: value for (n, labels), value in self._counters.items() if n == name
+            }
+
+    def histograms(self, name):
+        with self._lock:
+            return {
+                labels: histogram for (n, labels), histogram in self._histograms.items()
+                if n == name
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """Everything in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count, h.bounds))
+                for key, h in self._histograms.items()
+            )
+
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for (name, labels), (counts, total, count, bounds) in histograms:
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(list(bounds) + ["+Inf"], counts):
+                cumulative += n
+                le = labels + (("le", str(bound)),)
+                lines.append(f"{name}_bucket{_labels(le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _label_key(labels):
+    # Values as strings so 200 and "error" sort together
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+METRICS = Registry()
+
+# -------------------------------------------------
+# Recording Helpers
+# -------------------------------------------------
+def record_call(upstream, seconds, status, size=None, retries=0):
+    """One finished upstream call. ``status`` is the HTTP status or "error"."""
+    METRICS.observe("upstream_request_seconds", seconds, upstream=upstream)
+    METRICS.inc("upstream_responses_total", upstream=upstream, status=status)
+    if retries:
+        METRICS.inc("upstream_retries_total", retries, upstream=upstream)
+    if size is not None:
+        METRICS.observe("upstream_response_bytes", size, buckets=SIZE_BUCKETS,
+                        upstream=upstream)
+
+def record_cache(upstream, result):
+    METRICS.inc("cache_lookups_total", upstream=upstream, result=result)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+def upstream_summary():
+    """One row per upstream for the admin panel: call count, latency
+    percentiles (ms), errors, retries, payload size and cache hit rate."""
+    latency = {dict(l)["upstream"]: h for l, h in METRICS.histograms("upstream_request_seconds").items()}
+    sizes = {dict(l)["upstream"]: h for l, h in METRICS.histograms("upstream_response_bytes").items()}
+    retries = {dict(l)["upstream"]: n for l, n in METRICS.counters("upstream_retries_total").items()}
+    statuses, cache = {}, {}
+    for labels, n in METRICS.counters("upstream_responses_total").items():
+        labels = dict(labels)
+        statuses.setdefault(labels["upstream"], {})[str(labels["status"])] = n
+    for labels, n in METRICS.counters("cache_lookups_total").items():
+        labels = dict(labels)
+        cache.setdefault(labels["upstream"], {})[labels["result"]] = n
+
+    rows = []
+    for upstream in sorted(set(latency) | set(cache)):
+        h = latency.get(upstream)
+        codes = statuses.get(upstream, {})
+        lookups = cache.get(upstream, {})
+        hits = lookups.get("hit", 0) + lookups.get("stale", 0)
+        size = sizes.get(upstream)
+        rows.append({
+            "upstream": upstream,
+            "calls": h.count if h else 0,
+            "p50 ms": _ms(h.quantile(0.5)) if h else None,
+            "p95 ms": _ms(h.quantile(0.95)) if h else None,
+            "p99 ms": _ms(h.quantile(0.99)) if h else None,
+            "statuses": ", ".join(f"{code}×{n}" for code, n in sorted(codes.items())),
+            "retries": retries.get(upstream, 0),
+            "avg KB": round(size.sum / size.count / 1000, 1) if size and size.count else None,
+            "cache hit %": round(100 * hits / sum(lookups.values()), 1) if lookups else None,
+        })
+    return rows
+
+def phase_summary():
+    rows = []
+    for labels, h in sorted(METRICS.histograms("rerun_phase_seconds").items()):
+        rows.append({
+            "phase": dict(labels)["phase"],
+            "runs": h.count,
+            "avg ms": _ms(h.sum / h.count),
+            "p50 ms": _ms(h.quantile(0.5)),
+            "p95 ms": _ms(h.quantile(0.95)),
+        })
+    return rows
+
+
+class RerunTimer:
+    """Times consecutive phases of one Streamlit script run.
+
+    ``mark(phase)`` closes the phase that started at the previous mark, so
+    the script only needs one call at each boundary.
+    """
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        METRICS.observe("rerun_phase_seconds", now - self._last, phase=phase)
+        self._last = now
+
+    def finish(self):
+        METRICS.observe(
+            "rerun_phase_seconds", time.perf_counter() - self.started, phase="total"
+        )
+        write_metrics_file()
+
+# -------------------------------------------------
+# Export
+# -------------------------------------------------
+def write_metrics_file(path=None):
+    path = path or METRICS_FILE
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp, "w") as f:
+            f.write(METRICS.render())
+        # Atomic so a scraper never reads half a file
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Could not write metrics file %s: %s", path, e)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_server(port=None):
+    """Serve ``/metrics`` on ``port`` (default ``METRICS_PORT``) once per
+    process. Does nothing when no port is configured."""
+    global _server
+    port = port or METRICS_PORT
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+            except OSError as e:
+                # Remembered so later reruns don't retry and log it again
+                logger.warning("Could not serve metrics on port %s: %s", port, e)
+                _server = False
+                return None
+            threading.Thread(
+                target=_server.serve_forever, daemon=True, name="metrics"
+            ).start()
+    return _server or None
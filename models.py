@@ -0,0 +1,87 @@
+import sys
+
+# -------------------------------------------------
+# Paper Record
+# -------------------------------------------------
+ABSTRACT_PREVIEW = 400
+
+class Paper:
+    """Compact, parsed-once view of a Semantic Scholar paper.
+
+    Held in session state instead of the raw API dict: authors are joined
+    into their display string up front, the abstract preview is cut once,
+    and venues are interned so repeated names share one string.
+    """
+
+    __slots__ = (
+        "paper_id", "title", "authors", "author_refs", "year", "citations",
+        "venue", "abstract", "abstract_preview", "url", "score",
+    )
+
+    def __init__(self, paper_id, title, author_refs=(), year=None, citations=0,
+                 venue=None, abstract=None, url=None, score=None):
+        self.paper_id = paper_id
+        self.title = title or ""
+        self.author_refs = tuple(author_refs)
+        self.authors = ", ".join(name for _, name in self.author_refs)
+        self.year = year
+        self.citations = citations or 0
+        self.venue = sys.intern(venue) if venue else None
+        self.abstract = abstract or None
+        self.abstract_preview = (
+            abstract[:ABSTRACT_PREVIEW] + "..." if abstract else None
+        )
+        self.url = url
+        self.score = score
+
+    @classmethod
+    def from_api(cls, data):
+        return cls(
+            paper_id=data.get("paperId"),
+            title=data.get("title"),
+            author_refs=[
+                (a.get("authorId"), a.get("name") or "")
+                for a in data.get("authors") or []
+            ],
+            year=data.get("year"),
+            citations=data.get("citationCount"),
+            venue=data.get("venue"),
+            abstract=data.get("abstract"),
+            url=data.get("url"),
+            score=data.get("_score"),
+        )
+
+    @classmethod
+    def coerce(cls, paper):
+        return paper if isinstance(paper, cls) else cls.from_api(paper)
+
+    def to_dict(self):
+        """The API-shaped dict, for caches and JSON exports."""
+        return {
+            "paperId": self.paper_id,
+            "title": self.title,
+            "authors": [{"authorId": a, "name": n} for a, n in self.author_refs],
+            "year": self.year,
+            "citationCount": self.citations,
+            "venue": self.venue,
+            "abstract": self.abstract,
+            "url": self.url,
+        }
+
+    # Same paperId means the same paper; records without one (some local
+    # index or author-list rows) are only equal to themselves
+    def __eq__(self, other):
+        if not isinstance(other, Paper):
+            return NotImplemented
+        if self.paper_id is None or other.paper_id is None:
+            return self is other
+        return self.paper_id == other.paper_id
+
+    def __hash__(self):
+        return object.__hash__(self) if self.paper_id is None else hash(self.paper_id)
+
+    def __repr__(self):
+        return f"Paper({self.paper_id!r}, {self.title!r})"
+
+def parse_papers(data):
+    return [Paper.from_api(d) for d in data]
@@ -0,0 +1,288 @@
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+import http_client
+from cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Fan-out Settings
+# -------------------------------------------------
+PROVIDER_WORKERS = 16
+PROVIDER_RESULTS = 2
+PROVIDER_CACHE_TTL = 24 * 60 * 60
+# A provider that errored or timed out is skipped for this long
+PROVIDER_BACKOFF = 60
+# Longest a lookup may sit in the shared pool before it is given up
+PROVIDER_QUEUE_WAIT = 10.0
+
+_executor = ThreadPoolExecutor(max_workers=PROVIDER_WORKERS, thread_name_prefix="provider")
+provider_cache = DiskCache("providers", max_entries=5000, default_ttl=PROVIDER_CACHE_TTL)
+
+# -------------------------------------------------
+# Helper: smart keyword query
+# -------------------------------------------------
+def build_search_query(title):
+    stopwords = {
+        "a", "an", "the", "of", "and", "to", "in", "for", "with",
+        "using", "based", "via", "from", "through", "mostly"
+    }
+    words = title.lower().split()
+    keywords = [w.strip(".,") for w in words if w.isalpha() and w not in stopwords]
+    return " ".join(keywords[:6])
+
+# -------------------------------------------------
+# Provider Interface
+# -------------------------------------------------
+class Provider:
+    """An external source of datasets / code for a paper.
+
+    Subclasses set ``name``/``icon`` and implement ``search``, returning a
+    list of ``{"title", "url"}`` dicts. ``deadline`` is the number of
+    seconds the provider gets before its result is dropped.
+    """
+
+    name = "Provider"
+    icon = "🔗"
+    deadline = 4.0
+
+    def is_configured(self):
+        return True
+
+    def search(self, query):
+        raise NotImplementedError
+
+    def _get(self, url, **kwargs):
+        # One attempt only: the deadline leaves no room for backoff
+        return http_client.get(
+            url, timeout=(min(3.05, self.deadline), self.deadline), max_retries=0, **kwargs
+        )
+
+
+class PapersWithCodeProvider(Provider):
+    name = "PapersWithCode"
+    icon = "💻"
+
+    def search(self, query):
+        r = self._get("https://paperswithcode.com/api/v1/search/", params={"q": query})
+        r.raise_for_status()
+        return [
+            {
+                "title": item.get("paper", {}).get("title") or item.get("paper_title"),
+                "url": "https://paperswithcode.com/paper/" + item.get("paper", {}).get("id", ""),
+            }
+            for item in r.json().get("results", [])[:PROVIDER_RESULTS]
+        ]
+
+
+class ZenodoProvider(Provider):
+    name = "Zenodo"
+    icon = "📊"
+
+    def search(self, query):
+        r = self._get(
+            "https://zenodo.org/api/records/", params={"q": query, "size": PROVIDER_RESULTS}
+        )
+        r.raise_for_status()
+        return [
+            {"title": z["metadata"]["title"], "url": z.get("links", {}).get("html")}
+            for z in r.json().get("hits", {}).get("hits", [])
+        ]
+
+
+class GitHubProvider(Provider):
+    name = "GitHub"
+    icon = "💻"
+
+    # Unauthenticated search allows ~10 requests a minute, less than one page
+    def is_configured(self):
+        return bool(os.getenv("GITHUB_TOKEN"))
+
+    def search(self, query):
+        r = self._get(
+            "https://api.github.com/search/repositories",
+            params={"q": query, "sort": "stars", "order": "desc", "per_page": PROVIDER_RESULTS},
+            headers={"Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}"},
+        )
+        r.raise_for_status()
+        return [
+            {"title": g["full_name"], "url": g["html_url"]}
+            for g in r.json().get("items", [])
+        ]
+
+
+class KaggleProvider(Provider):
+    name = "Kaggle"
+    icon = "📊"
+
+    def is_configured(self):
+        return bool(os.getenv("KAGGLE_USERNAME") and os.getenv("KAGGLE_KEY"))
+
+    def search(self, query):
+        r = self._get(
+            "https://www.kaggle.com/api/v1/datasets/list",
+            params={"search": query, "pageSize": PROVIDER_RESULTS},
+            auth=(os.getenv("KAGGLE_USERNAME"), os.getenv("KAGGLE_KEY")),
+        )
+        r.raise_for_status()
+        return [
+            {"title": k["title"], "url": "https://www.kaggle.com/datasets/" + k.get("ref", "")}
+            for k in r.json()[:PROVIDER_RESULTS]
+        ]
+
+
+PROVIDERS = [
+    PapersWithCodeProvider(),
+    GitHubProvider(),
+    ZenodoProvider(),
+    KaggleProvider(),
+]
+
+def register_provider(provider):
+    PROVIDERS.append(provider)
+
+# -------------------------------------------------
+# Concurrent Fan-out
+# -------------------------------------------------
+RETRY_STATUSES = ("timeout", "error", "backoff")
+
+
+class ProviderResult:
+    __slots__ = ("provider", "status", "items", "error")
+
+    def __init__(self, provider, status, items=(), error=None):
+        self.provider = provider
+        self.status = status  # "ok" | "timeout" | "error" | "backoff" | "unconfigured"
+        self.items = list(items)
+        self.error = error
+
+
+def _run_provider(provider, query):
+    key = f"{provider.name}:{query}"
+    cached = provider_cache.get(key)
+    if cached is not None:
+        return cached
+    items = provider.search(query)
+    provider_cache.set(key, items)
+    return items
+
+
+# Provider name -> monotonic time before which it isn't asked again
+_backoff_until = {}
+
+def _back_off(provider):
+    _backoff_until[provider.name] = time.monotonic() + PROVIDER_BACKOFF
+
+def _backing_off(provider):
+    return time.monotonic() < _backoff_until.get(provider.name, 0.0)
+
+
+class FanOut:
+    """All providers for one query, started at once on the shared pool.
+
+    Iterating yields a ``ProviderResult`` per provider as soon as it
+    finishes; providers that miss their own deadline are cancelled and
+    reported as timeouts, so the total wait is bounded by the slowest
+    deadline rather than the sum of all requests. A deadline runs from
+    when the request actually starts, not from time spent queued behind
+    other sessions' lookups in the shared pool.
+    """
+
+    def __init__(self, query, providers=None):
+        self.query = query
+        self.results = []
+        self._futures = {}
+        self._began = {}
+        self._start(PROVIDERS if providers is None else providers)
+
+    def _run(self, provider):
+        self._began[provider] = time.monotonic()
+        return _run_provider(provider, self.query)
+
+    def _deadline(self, provider, now):
+        began = self._began.get(provider)
+        if began is not None:
+            return began + provider.deadline
+        # Still queued: check again once it could have started and finished
+        return min(now + provider.deadline, self.started + PROVIDER_QUEUE_WAIT)
+
+    def _start(self, providers):
+        self.started = time.monotonic()
+        for provider in providers:
+            if not provider.is_configured():
+                self.results.append(ProviderResult(provider, "unconfigured"))
+            elif _backing_off(provider):
+                # Failed recently (e.g. rate limited): not worth a request yet
+                self.results.append(ProviderResult(provider, "backoff"))
+            else:
+                future = _executor.submit(self._run, provider)
+                self._futures[future] = provider
+
+    def __iter__(self):
+        # Results collected by an earlier pass (e.g. a previous rerun that
+        # was cut short) are replayed; only the rest are waited for
+        yield from list(self.results)
+
+        pending = self._futures
+        while pending:
+            now = time.monotonic()
+            next_deadline = min(self._deadline(p, now) for p in pending.values())
+            done, _ = wait(
+                pending, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                result = self._collect(pending.pop(future), future)
+                self.results.append(result)
+                yield result
+
+            # Drop providers whose own deadline has passed
+            now = time.monotonic()
+            for future, provider in list(pending.items()):
+                if now < self._deadline(provider, now):
+                    continue
+                future.cancel()
+                del pending[future]
+                # Only a request that reached the provider says anything
+                # about it; one given up while still queued doesn't
+                if provider in self._began:
+                    _back_off(provider)
+                result = ProviderResult(provider, "timeout")
+                self.results.append(result)
+                yield result
+
+    @property
+    def failed(self):
+        """Finished, with at least one provider timed out, errored or
+        skipped while backing off."""
+        return not self._futures and any(
+            r.status in RETRY_STATUSES for r in self.results
+        )
+
+    def retry(self):
+        """Ask only the failed providers again, keeping the other results.
+        Providers still backing off are skipped without a request."""
+        failed = [r.provider for r in self.results if r.status in RETRY_STATUSES]
+        self.results = [r for r in self.results if r.status not in RETRY_STATUSES]
+        self._start(failed)
+
+    @staticmethod
+    def _collect(provider, future):
+        try:
+            return ProviderResult(provider, "ok", future.result())
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            logger.warning("%s lookup failed: %s", provider.name, e)
+            _back_off(provider)
+            return ProviderResult(provider, "error", error=str(e))
+
+    def cancel(self):
+        for future in self._futures:
+            future.cancel()
+
+
+def fan_out(title, providers=None):
+    return FanOut(build_search_query(title), providers)
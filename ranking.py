@@ -0,0 +1,129 @@
+import re
+
+import numpy as np
+
+# -------------------------------------------------
+# Tokenization
+# -------------------------------------------------
+STOPWORDS = {
+    "a", "an", "the", "of", "and", "or", "to", "in", "on", "for", "with",
+    "by", "at", "as", "is", "are", "be", "from", "via", "using", "based",
+    "towards", "toward", "into", "its", "their", "this", "that",
+}
+
+WORD = re.compile(r"[^\W_]+", re.UNICODE)
+
+def tokenize(text):
+    return [w for w in WORD.findall((text or "").lower()) if w not in STOPWORDS]
+
+def char_ngrams(tokens, n=3):
+    text = f" {' '.join(tokens)} "
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+# -------------------------------------------------
+# Sparse TF-IDF (CSR-free, NumPy only)
+# -------------------------------------------------
+class TfidfMatrix:
+    """L2-normalised TF-IDF rows for a list of token lists.
+
+    Stored as coordinate arrays so a query can be scored against every
+    candidate with one ``np.bincount`` instead of a Python loop.
+    """
+
+    def __init__(self, docs):
+        self.vocab = {}
+        rows, cols = [], []
+        for row, terms in enumerate(docs):
+            for term in terms:
+                cols.append(self.vocab.setdefault(term, len(self.vocab)))
+            rows.extend([row] * len(terms))
+
+        self.n_docs = len(docs)
+        n_terms = max(len(self.vocab), 1)
+        if not cols:
+            self.rows = self.cols = np.zeros(0, dtype=np.int64)
+            self.data = np.zeros(0)
+            self.idf = np.ones(n_terms)
+            return
+
+        # Collapse duplicate (row, term) pairs into term frequencies
+        keys, tf = np.unique(
+            np.asarray(rows, dtype=np.int64) * n_terms + np.asarray(cols, dtype=np.int64),
+            return_counts=True,
+        )
+        self.rows, self.cols = np.divmod(keys, n_terms)
+
+        df = np.bincount(self.cols, minlength=n_terms)
+        self.idf = np.log((1 + self.n_docs) / (1 + df)) + 1.0
+
+        data = (1.0 + np.log(tf)) * self.idf[self.cols]
+        norms = np.sqrt(np.bincount(self.rows, weights=data ** 2, minlength=self.n_docs))
+        self.data = data / np.maximum(norms, 1e-12)[self.rows]
+
+    def query_vector(self, terms):
+        vec = np.zeros(len(self.idf))
+        ids = [self.vocab[t] for t in terms if t in self.vocab]
+        if ids:
+            np.add.at(vec, ids, 1.0)
+            present = vec > 0
+            vec[present] = (1.0 + np.log(vec[present])) * self.idf[present]
+            vec /= np.linalg.norm(vec)
+        return vec
+
+    def cosine(self, terms):
+        vec = self.query_vector(terms)
+        return np.bincount(
+            self.rows, weights=self.data * vec[self.cols], minlength=self.n_docs
+        )
+
+# -------------------------------------------------
+# Ranking Modes
+# -------------------------------------------------
+def score_titles(query, titles, mode="exact", abstracts=None):
+    """Score every candidate against the query in one vectorised pass.
+
+    exact: word + character-trigram cosine, with a full match pinned to 1.
+    fuzzy: character-trigram cosine only (tolerates typos and inflection).
+    topic: word TF-IDF over title and abstract.
+    """
+    if not titles:
+        return np.zeros(0)
+
+    query_tokens = tokenize(query)
+    title_tokens = [tokenize(t) for t in titles]
+
+    if mode == "topic":
+        abstracts = abstracts or [""] * len(titles)
+        docs = [t + tokenize(a) for t, a in zip(title_tokens, abstracts)]
+        return TfidfMatrix(docs).cosine(query_tokens)
+
+    chars = TfidfMatrix([char_ngrams(t) for t in title_tokens]).cosine(char_ngrams(query_tokens))
+    if mode == "fuzzy":
+        return chars
+
+    words = TfidfMatrix(title_tokens).cosine(query_tokens)
+    scores = 0.6 * words + 0.4 * chars
+    normalized_query = " ".join(query_tokens)
+    exact = np.fromiter(
+        (" ".join(t) == normalized_query for t in title_tokens), dtype=bool, count=len(titles)
+    )
+    if normalized_query:
+        scores[exact] = 1.0
+    return scores
+
+def rank_papers(query, papers, mode="exact"):
+    """Return papers sorted by score, each tagged with its ``_score``."""
+    scores = score_titles(
+        query,
+        [p.get("title") or "" for p in papers],
+        mode=mode,
+        abstracts=[p.get("abstract") or "" for p in papers] if mode == "topic" else None,
+    )
+    # Stable sort keeps API relevance order among ties
+    order = np.argsort(-scores, kind="stable")
+    ranked = []
+    for i in order:
+        paper = papers[i]
+        paper["_score"] = float(scores[i])
+        ranked.append(paper)
+    return ranked
@@ -0,0 +1,181 @@
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+from cache import CACHE_DIR
+
+# -------------------------------------------------
+# Priorities
+# -------------------------------------------------
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_priority = contextvars.ContextVar("rate_limit_priority", default=INTERACTIVE)
+
+@contextlib.contextmanager
+def background():
+    """Mark upstream calls made inside the block (e.g. prefetch) as
+    background work, so interactive requests are served first."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def run_in_background(fn, *args, **kwargs):
+    with background():
+        return fn(*args, **kwargs)
+
+def current_priority():
+    return _priority.get()
+
+# -------------------------------------------------
+# Token Stores
+# -------------------------------------------------
+class MemoryStore:
+    def __init__(self):
+        self._state = {}
+
+    def take(self, name, rate, capacity):
+        """Consume one token; return 0 on success, else seconds to wait."""
+        now = time.monotonic()
+        tokens, updated = self._state.get(name, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens >= 1:
+            self._state[name] = (tokens - 1, now)
+            return 0.0
+        self._state[name] = (tokens, now)
+        return (1 - tokens) / rate
+
+
+class SqliteStore:
+    """Buckets shared by every process on the machine via one SQLite file."""
+
+    def __init__(self, path=None):
+        path = path or os.path.join(CACHE_DIR, "ratelimit.sqlite3")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+        )
+        self._lock = threading.Lock()
+
+    def take(self, name, rate, capacity):
+        # Wall-clock time, since monotonic clocks differ between processes
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (name, tokens, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+# -------------------------------------------------
+# Priority-queued Token Bucket
+# -------------------------------------------------
+class RateLimitTimeout(TimeoutError):
+    pass
+
+
+class RateLimiter:
+    """Token bucket with a waiting queue.
+
+    Callers queue instead of failing: they are served in priority order
+    (interactive before background, then first come first served) and give
+    up only once their deadline passes.
+    """
+
+    def __init__(self, name, rate, capacity, store=None,
+                 interactive_wait=15.0, background_wait=60.0):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.store = store or MemoryStore()
+        self.max_wait = {INTERACTIVE: interactive_wait, BACKGROUND: background_wait}
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+
+    def acquire(self, priority=None, timeout=None):
+        """Wait for a token; returns False if the deadline passed first."""
+        priority = current_priority() if priority is None else priority
+        timeout = self.max_wait[priority] if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        ticket = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._queue[0] == ticket:
+                        wait = self.store.take(self.name, self.rate, self.capacity)
+                        if wait == 0:
+                            return True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RateLimitTimeout(f"Timed out waiting for the {self.name} rate limit")
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+# -------------------------------------------------
+# Upstream Buckets (override via environment)
+# -------------------------------------------------
+# RATE_LIMIT_SHARED=1 keeps the buckets in SQLite so that several worker
+# processes share one budget per upstream.
+_store = SqliteStore() if os.getenv("RATE_LIMIT_SHARED") == "1" else MemoryStore()
+
+S2_SEARCH = RateLimiter(
+    "s2_search",
+    rate=float(os.getenv("S2_SEARCH_RPS", "1")),
+    capacity=float(os.getenv("S2_SEARCH_BURST", "3")),
+    store=_store,
+)
+S2_PAPER = RateLimiter(
+    "s2_paper",
+    rate=float(os.getenv("S2_PAPER_RPS", "1")),
+    capacity=float(os.getenv("S2_PAPER_BURST", "3")),
+    store=_store,
+)
+GEMINI = RateLimiter(
+    "gemini",
+    rate=float(os.getenv("GEMINI_RPS", "0.25")),
+    capacity=float(os.getenv("GEMINI_BURST", "4")),
+    store=_store,
+    interactive_wait=30.0,
+    background_wait=120.0,
+)
@@ -0,0 +1,558 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_client
+import local_index
+import metrics
+import rate_limit
+from singleflight import SingleFlight
+from cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Semantic Scholar API
+# -------------------------------------------------
+S2_API = "https://api.semanticscholar.org/graph/v1"
+PAPER_FIELDS = "title,authors,year,abstract,url,citationCount,venue"
+
+# -------------------------------------------------
+# Response Cache
+# -------------------------------------------------
+# Identifier lookups resolve to one fixed paper, so they can live longer
+# than keyword searches whose ranking and citation counts drift.
+SEARCH_CACHE_TTL = 60 * 60
+LOOKUP_CACHE_TTL = 24 * 60 * 60
+SEARCH_CACHE_MAX_ENTRIES = 5000
+
+# Stale-while-revalidate: past these ages a cached page is still served
+# straight away, but refreshed in the background. The TTLs above remain
+# the hard limit on how stale a served page can get.
+STALE_WHILE_REVALIDATE = os.getenv("S2_STALE_WHILE_REVALIDATE", "1") != "0"
+SEARCH_FRESH_FOR = float(os.getenv("S2_SEARCH_FRESH_SECONDS", 10 * 60))
+LOOKUP_FRESH_FOR = float(os.getenv("S2_LOOKUP_FRESH_SECONDS", 6 * 60 * 60))
+
+# Relevance search can only page through the first 1,000 matches
+MAX_SEARCH_RESULTS = 1000
+
+search_cache = DiskCache(
+    "search", max_entries=SEARCH_CACHE_MAX_ENTRIES, default_ttl=SEARCH_CACHE_TTL
+)
+
+# Background searches (local-first results are merged with these later)
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search")
+
+# Identical searches from different sessions share one upstream call
+search_flight = SingleFlight()
+
+# -------------------------------------------------
+# DOI NORMALIZATION
+# -------------------------------------------------
+def normalize_doi(query):
+    query = query.strip()
+    if "doi.org/" in query:
+        return query.split("doi.org/")[-1]
+    return query
+
+# -------------------------------------------------
+# Semantic Scholar URL NORMALIZATION ✅
+# -------------------------------------------------
+def normalize_semantic_scholar_url(query):
+    query = query.strip()
+    if "semanticscholar.org/paper/" in query:
+        return query.rstrip("/").split("/")[-1]
+    return None
+
+# -------------------------------------------------
+# arXiv URL NORMALIZATION
+# -------------------------------------------------
+def normalize_arxiv_url(query):
+    query = query.strip()
+    if "arxiv.org/" in query:
+        # examples:
+        # https://arxiv.org/abs/2301.12345
+        # https://arxiv.org/pdf/2301.12345.pdf
+        parts = query.rstrip("/").split("/")
+        arxiv_id = parts[-1].replace(".pdf", "")
+        return arxiv_id
+    return None
+
+
+# -------------------------------------------------
+# IEEE / SPRINGER URL NORMALIZATION
+# -------------------------------------------------
+def normalize_publisher_url(query):
+    query = query.strip()
+
+    if "ieeexplore.ieee.org/document/" in query:
+        # https://ieeexplore.ieee.org/document/1234567
+        return query.rstrip("/").split("/")[-1]
+
+    if "link.springer.com/article/" in query:
+        # https://link.springer.com/article/10.1007/s12345-678-9012
+        return query.rstrip("/").split("/")[-1]
+
+    return None
+
+
+
+# -------------------------------------------------
+# Google-Scholar-like Helpers
+# -------------------------------------------------
+def is_exact_title_query(query):
+    return len(query.split()) >= 6
+
+# -------------------------------------------------
+# Cache Keys
+# -------------------------------------------------
+def normalize_query(query):
+    return " ".join(query.split()).lower()
+
+def search_cache_key(query, from_year=None, to_year=None, limit=25, offset=0,
+                     fields=PAPER_FIELDS):
+    # Identifier lookups ignore year range and paging, so they share one entry
+    paper_ref = identifier_ref(query)
+    if paper_ref:
+        return lookup_cache_key(paper_ref, fields)
+    return json.dumps(
+        ["search", normalize_query(query), from_year, to_year, limit, offset, fields]
+    )
+
+def lookup_cache_key(paper_ref, fields=PAPER_FIELDS):
+    return json.dumps(["paper", paper_ref.lower(), fields])
+
+# -------------------------------------------------
+# Identifier Queries (DOI / Semantic Scholar URL / arXiv URL)
+# -------------------------------------------------
+def identifier_ref(query):
+    query = normalize_doi(query)
+
+    if query.startswith("10."):
+        return f"DOI:{query}"
+
+    ss_id = normalize_semantic_scholar_url(query)
+    if ss_id:
+        return ss_id
+
+    arxiv_id = normalize_arxiv_url(query)
+    if arxiv_id:
+        return f"ARXIV:{arxiv_id}"
+
+    return None
+
+def is_identifier_query(query):
+    return identifier_ref(query) is not None
+
+def upstream_name(paper_ref):
+    """Metrics label for a lookup: "doi", "arxiv" or "paper_id"."""
+    if paper_ref is None:
+        return "search"
+    prefix, sep, _ = paper_ref.partition(":")
+    return prefix.lower() if sep else "paper_id"
+
+# -------------------------------------------------
+# Semantic Scholar Search
+# -------------------------------------------------
+def search_page(query, from_year=None, to_year=None, limit=25, offset=0):
+    """Fetch one page of results as ``{"data": [...], "total": n}``.
+
+    ``total`` is the number of matches the API reports, capped at what
+    relevance search can page through. A stale cached page also carries
+    ``refresh``, a future for its background revalidation. A failed fetch
+    comes back empty with ``failed`` set, unlike a search with no matches.
+    """
+    key = search_cache_key(query, from_year, to_year, limit, offset)
+    upstream = upstream_name(identifier_ref(query))
+    page, age = search_cache.get_with_age(key)
+    if page is not None and STALE_WHILE_REVALIDATE and age > fresh_for(query):
+        # Serve what we have now; ``refresh`` resolves to True if it changed
+        metrics.record_cache(upstream, "stale")
+        page["refresh"] = _revalidate_async(key, query, from_year, to_year, limit, offset,
+                                            page)
+    elif page is not None:
+        metrics.record_cache(upstream, "hit")
+    else:
+        metrics.record_cache(upstream, "miss")
+        page = search_flight.do(
+            key, _fetch_page, key, query, from_year, to_year, limit, offset
+        )
+
+        # Failed requests come back as None and are never cached
+        if page is None:
+            return {"data": [], "total": 0, "failed": True}
+
+    # An identifier resolves to a single paper, which only exists on page one
+    if is_identifier_query(query) and offset:
+        return {"data": [], "total": page["total"]}
+    return page
+
+def _fetch_page(key, query, from_year, to_year, limit, offset):
+    page = _search_papers_uncached(query, from_year, to_year, limit, offset)
+    if page is None:
+        return None
+
+    ttl = LOOKUP_CACHE_TTL if is_identifier_query(query) else SEARCH_CACHE_TTL
+    search_cache.set(key, page, ttl=ttl)
+
+    try:
+        local_index.add_papers(page["data"])
+    except sqlite3.Error as e:
+        logger.warning("Could not index search results: %s", e)
+    return page
+
+def fresh_for(query):
+    return LOOKUP_FRESH_FOR if is_identifier_query(query) else SEARCH_FRESH_FOR
+
+# One refresh per stale key, however many sessions read it meanwhile
+_revalidating = {}
+_revalidating_lock = threading.Lock()
+
+def _revalidate_async(key, query, from_year, to_year, limit, offset, stale):
+    with _revalidating_lock:
+        future = _revalidating.get(key)
+        if future is None:
+            future = _executor.submit(
+                rate_limit.run_in_background, _revalidate,
+                key, query, from_year, to_year, limit, offset, stale,
+            )
+            _revalidating[key] = future
+    # Outside the lock: the callback runs inline if the refresh already finished
+    future.add_done_callback(lambda _: _forget_revalidation(key))
+    return future
+
+def _forget_revalidation(key):
+    with _revalidating_lock:
+        _revalidating.pop(key, None)
+
+def _revalidate(key, query, from_year, to_year, limit, offset, stale):
+    page = search_flight.do(
+        key, _fetch_page, key, query, from_year, to_year, limit, offset
+    )
+    # A failed refresh keeps the stale page until its TTL runs out
+    return page is not None and page["data"] != stale["data"]
+
+def search_papers(query, from_year=None, to_year=None, limit=25, offset=0):
+    return search_page(query, from_year, to_year, limit, offset)["data"]
+
+def search_page_async(query, from_year=None, to_year=None, limit=25, offset=0,
+                      background=False):
+    if background:
+        return _executor.submit(
+            rate_limit.run_in_background, search_page, query, from_year, to_year, limit, offset
+        )
+    return _executor.submit(search_page, query, from_year, to_year, limit, offset)
+
+# -------------------------------------------------
+# Local-first Search
+# -------------------------------------------------
+def search_local(query, from_year=None, to_year=None, limit=25):
+    if is_identifier_query(query):
+        return []
+    try:
+        return local_index.search_local(
+            normalize_doi(query), from_year, to_year, limit
+        )
+    except sqlite3.Error as e:
+        logger.warning("Local index search failed: %s", e)
+        return []
+
+def merge_results(network, local, limit=25):
+    # Network order wins; locally known papers it missed are appended
+    seen = {p.get("paperId") for p in network}
+    extra = [p for p in local if p.get("paperId") not in seen]
+    return (network + extra)[:limit]
+
+# -------------------------------------------------
+# Sorted Results (Newest / Citations)
+# -------------------------------------------------
+SORT_OPTIONS = ["Relevance", "Newest", "Citations"]
+
+# Bulk search sort parameter for each option
+SERVER_SORT = {
+    "Newest": "publicationDate:desc",
+    "Citations": "citationCount:desc",
+}
+
+# Result sets up to this size are pulled once and ordered locally
+CLIENT_SORT_LIMIT = 300
+API_PAGE_LIMIT = 100
+
+def _sort_key(sort_by):
+    if sort_by == "Newest":
+        return lambda p: p.get("year") or 0
+    return lambda p: p.get("citationCount") or 0
+
+def sort_papers(papers, sort_by):
+    if sort_by not in SERVER_SORT:
+        return list(papers)
+    return sorted(papers, key=_sort_key(sort_by), reverse=True)
+
+def _client_sorted_set(query, from_year, to_year, total):
+    """Fetch a small result set once and cache every ordering with it."""
+    key = json.dumps(["sorted", normalize_query(query), from_year, to_year, PAPER_FIELDS])
+    entry = search_cache.get(key)
+    if entry is not None:
+        return entry
+
+    papers = []
+    complete = True
+    for offset in range(0, total, API_PAGE_LIMIT):
+        chunk = search_page(query, from_year, to_year, API_PAGE_LIMIT, offset)
+        complete = complete and not chunk.get("failed")
+        papers.extend(chunk["data"])
+
+    entry = {
+        "papers": papers,
+        "orderings": {
+            sort_by: sorted(range(len(papers)), key=lambda i: _sort_key(sort_by)(papers[i]),
+                            reverse=True)
+            for sort_by in SERVER_SORT
+        },
+    }
+    # A failed chunk would leave the set short; don't pin that in the cache
+    if complete:
+        search_cache.set(key, entry)
+    else:
+        entry["failed"] = True
+    return entry
+
+def fetch_bulk_batch(query, from_year=None, to_year=None, sort=None, token=None,
+                     fields=PAPER_FIELDS):
+    """One /paper/search/bulk call (up to 1,000 papers plus a continuation
+    token), or None if it failed."""
+    params = {
+        "query": keyword_query(query),
+        "fields": fields,
+    }
+    if sort:
+        params["sort"] = sort
+    if year_param(from_year, to_year):
+        params["year"] = year_param(from_year, to_year)
+    if token:
+        params["token"] = token
+    try:
+        r = http_client.get(
+            f"{S2_API}/paper/search/bulk", params=params, limiter=rate_limit.S2_SEARCH,
+            upstream="bulk",
+        )
+        if r.status_code != 200:
+            logger.warning("Bulk search returned %s for %r", r.status_code, query)
+            return None
+        return r.json()
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("Bulk search failed for %r: %s", query, e)
+        return None
+
+def _bulk_sorted(query, from_year, to_year, sort_by, needed):
+    """Page through bulk search with server-side sort until ``needed`` rows."""
+    key = json.dumps(
+        ["bulk-sorted", normalize_query(query), from_year, to_year, sort_by, PAPER_FIELDS]
+    )
+    entry = search_cache.get(key) or {"data": [], "token": None, "total": 0, "done": False}
+
+    fetched = False
+    while len(entry["data"]) < needed and not entry["done"]:
+        body = fetch_bulk_batch(
+            query, from_year, to_year, SERVER_SORT[sort_by], entry["token"]
+        )
+        if body is None:
+            break
+
+        entry["data"].extend(filter_years(body.get("data", []), from_year, to_year))
+        entry["total"] = body.get("total", entry["total"])
+        entry["token"] = body.get("token")
+        entry["done"] = not entry["token"]
+        fetched = True
+
+    if fetched:
+        search_cache.set(key, entry)
+    return entry
+
+def sorted_page(query, from_year=None, to_year=None, sort_by="Newest", limit=25, offset=0):
+    """Like ``search_page`` but ordered by ``sort_by``.
+
+    Small result sets are sorted client-side once and every ordering is
+    cached with them; large ones use bulk search's server-side sort.
+    """
+    if sort_by not in SERVER_SORT or is_identifier_query(query):
+        return search_page(query, from_year, to_year, limit, offset)
+
+    probe = search_page(query, from_year, to_year, limit, 0)
+    if probe.get("failed"):
+        # The size of the result set is unknown; nothing is cached from it
+        return probe
+    total = probe["total"]
+    if total <= CLIENT_SORT_LIMIT:
+        entry = _client_sorted_set(query, from_year, to_year, total)
+        order = entry["orderings"][sort_by][offset:offset + limit]
+        page = {"data": [entry["papers"][i] for i in order], "total": len(entry["papers"])}
+        if entry.get("failed") and not page["data"]:
+            page["failed"] = True
+        return page
+
+    entry = _bulk_sorted(query, from_year, to_year, sort_by, offset + limit)
+    total = len(entry["data"]) if entry["done"] else max(entry["total"], len(entry["data"]))
+    page = {"data": entry["data"][offset:offset + limit], "total": total}
+    # Short of the page while more rows remain: the bulk fetch failed
+    if not page["data"] and not entry["done"]:
+        page["failed"] = True
+    return page
+
+def sorted_page_async(query, from_year=None, to_year=None, sort_by="Newest", limit=25, offset=0,
+                      background=False):
+    # Background (prefetch) calls queue behind interactive ones at the rate limiter
+    if background:
+        return _executor.submit(
+            rate_limit.run_in_background, sorted_page, query, from_year, to_year, sort_by,
+            limit, offset
+        )
+    return _executor.submit(sorted_page, query, from_year, to_year, sort_by, limit, offset)
+
+# -------------------------------------------------
+# Query Helpers
+# -------------------------------------------------
+def keyword_query(query):
+    query = normalize_doi(query)
+    publisher_id = normalize_publisher_url(query)
+    if publisher_id:
+        return publisher_id.replace("-", " ").replace(".", " ")
+    return query
+
+def filter_years(papers, from_year=None, to_year=None):
+    if not (from_year and to_year):
+        return papers
+    return [
+        p for p in papers
+        if isinstance(p.get("year"), int)
+        and from_year <= p["year"] <= to_year
+    ]
+
+# -------------------------------------------------
+# Year Filtering
+# -------------------------------------------------
+def year_param(from_year=None, to_year=None):
+    if from_year and to_year:
+        return f"{from_year}-{to_year}"
+    return None
+
+def _year_filter_ignored(query, from_year, to_year, limit, offset):
+    # Only this request falls back; the next one tries the parameter again
+    logger.warning("Year parameter was ignored; filtering %r client-side", query)
+    return _collect_in_range(query, from_year, to_year, limit, offset)
+
+def _collect_in_range(query, from_year, to_year, limit, offset):
+    """Page through unfiltered results until ``limit`` in-range papers
+    past the first ``offset`` ones are found. None if a chunk failed
+    first, so the short result is never cached."""
+    collected, skipped, raw_offset = [], 0, 0
+    total = MAX_SEARCH_RESULTS
+    more = False
+    while len(collected) < limit and raw_offset < total:
+        # Unfiltered chunks are cached, so later pages re-scan cheaply
+        chunk = search_page(query, None, None, API_PAGE_LIMIT, raw_offset)
+        if chunk.get("failed"):
+            return None
+        if not chunk["data"]:
+            break
+        total = min(chunk["total"], MAX_SEARCH_RESULTS)
+        raw_offset += API_PAGE_LIMIT
+        for p in filter_years(chunk["data"], from_year, to_year):
+            if skipped < offset:
+                skipped += 1
+            elif len(collected) < limit:
+                collected.append(p)
+            else:
+                more = True
+
+    # Once every raw result has been scanned the in-range count is exact
+    exhausted = raw_offset >= total and not more
+    return {
+        "data": collected,
+        "total": offset + len(collected) if exhausted else total,
+    }
+
+def _search_papers_uncached(query, from_year=None, to_year=None, limit=25, offset=0):
+    query = normalize_doi(query)
+
+    # 1️⃣ DOI / Semantic Scholar URL / arXiv URL → exact paper
+    paper_ref = identifier_ref(query)
+    if paper_ref:
+        return _lookup_paper(paper_ref)
+
+    # 3️ IEEE / Springer URL SEARCH (fallback to keyword)
+    query = keyword_query(query)
+
+    # 4 NORMAL SEARCH
+    url = f"{S2_API}/paper/search"
+    limit = max(0, min(limit, MAX_SEARCH_RESULTS - offset))
+    if not limit:
+        return {"data": [], "total": MAX_SEARCH_RESULTS}
+    params = {
+        "query": query,
+        "offset": offset,
+        "limit": limit,
+        "fields": PAPER_FIELDS
+    }
+
+    # Year filter (pushed to the API so a filtered page is still a full page)
+    years = year_param(from_year, to_year)
+    if years:
+        params["year"] = years
+
+    try:
+        r = http_client.get(
+            url, params=params, limiter=rate_limit.S2_SEARCH, upstream="search"
+        )
+        if r.status_code != 200:
+            logger.warning("Paper search returned %s for %r", r.status_code, query)
+            return None
+
+        body = r.json()
+        data = body.get("data", [])
+        total = min(body.get("total", len(data)), MAX_SEARCH_RESULTS)
+
+        if years:
+            in_range = filter_years(data, from_year, to_year)
+            if len(in_range) < len(data) / 2:
+                return _year_filter_ignored(query, from_year, to_year, limit, offset)
+            # A few stray rows (e.g. no year at all) are just dropped
+            data = in_range
+
+        # Google-Scholar-like ranking
+        if is_exact_title_query(query):
+            # NumPy is only needed here, so it loads on the first title search
+            from ranking import rank_papers
+            data = rank_papers(query, data, mode="exact")
+
+        return {"data": data, "total": total}
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("Paper search failed for %r: %s", query, e)
+        return None
+
+# -------------------------------------------------
+# Single Paper Lookup (DOI / ARXIV / Paper ID)
+# -------------------------------------------------
+def _lookup_paper(paper_ref):
+    url = f"{S2_API}/paper/{paper_ref}"
+    params = {
+        "fields": PAPER_FIELDS
+    }
+    try:
+        r = http_client.get(
+            url, params=params, limiter=rate_limit.S2_PAPER, upstream=upstream_name(paper_ref)
+        )
+        if r.status_code == 200:
+            return {"data": [r.json()], "total": 1}
+        if r.status_code == 404:
+            return {"data": [], "total": 0}
+        logger.warning("Paper lookup returned %s for %s", r.status_code, paper_ref)
+        return None
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("Paper lookup failed for %s: %s", paper_ref, e)
+        return None
@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import Future
+
+# -------------------------------------------------
+# Request Coalescing (single-flight)
+# -------------------------------------------------
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one.
+
+    The first caller for a key runs the work; callers arriving while it is
+    in flight wait on the same future and share its result (or exception).
+    Streamlit sessions are threads of one process, so this covers every
+    session on a server.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def claim(self, key):
+        """Return ``(future, leader)``; the leader must call ``finish``."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def finish(self, key, future, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        future, leader = self.claim(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)